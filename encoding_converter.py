@@ -1,15 +1,35 @@
 import sys
 import os
-import chardet
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
                              QWidget, QPushButton, QLabel, QComboBox, QTextEdit, 
                              QFileDialog, QMessageBox, QProgressBar, QGroupBox,
-                             QGridLayout, QLineEdit)
+                             QGridLayout, QLineEdit, QDoubleSpinBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon
+from encoding_tools import (convert_file, convert_directory, detect_file_encoding,
+                            detect_bytes_encoding, write_report,
+                            DEFAULT_MIN_CONFIDENCE, SAMPLE_SIZE)
+
+
+class EncodingDetector(QThread):
+    """编码检测工作线程（UTF-8校验要读完整个文件，大文件不能放在界面线程中）"""
+    detection_finished = pyqtSignal(str, float)
+    error_occurred = pyqtSignal(str)
+    
+    def __init__(self, input_file):
+        super().__init__()
+        self.input_file = input_file
+    
+    def run(self):
+        try:
+            encoding, confidence = detect_file_encoding(self.input_file)
+            self.detection_finished.emit(encoding or '', confidence or 0.0)
+        except Exception as e:
+            self.error_occurred.emit(f"编码检测失败：{str(e)}")
+
 
 class EncodingConverter(QThread):
-    """编码转换工作线程"""
+    """编码转换工作线程，source_encoding为None时先在线程中自动检测"""
     progress_updated = pyqtSignal(int)
     conversion_finished = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
@@ -20,21 +40,36 @@ class EncodingConverter(QThread):
         self.output_file = output_file
         self.source_encoding = source_encoding
         self.target_encoding = target_encoding
+        self._last_percent = -1
+    
+    def report_progress(self, processed, total):
+        # 只在百分比变化时发送信号，避免大文件刷屏
+        percent = 100 if total == 0 else int(processed * 100 / total)
+        if percent != self._last_percent:
+            self._last_percent = percent
+            self.progress_updated.emit(percent)
     
     def run(self):
         try:
-            # 读取原文件
-            self.progress_updated.emit(20)
-            with open(self.input_file, 'r', encoding=self.source_encoding) as f:
-                content = f.read()
+            if self.source_encoding is None:
+                encoding, confidence = detect_file_encoding(self.input_file)
+                if not encoding:
+                    self.error_occurred.emit("无法自动检测源文件编码！")
+                    return
+                if confidence < DEFAULT_MIN_CONFIDENCE:
+                    self.error_occurred.emit(
+                        f"检测到 {encoding}，但置信度过低（{confidence:.2%}），请手动选择源编码")
+                    return
+                self.source_encoding = encoding
             
-            self.progress_updated.emit(60)
+            total = os.path.getsize(self.input_file)
+            self.report_progress(0, total)
             
-            # 写入新文件
-            with open(self.output_file, 'w', encoding=self.target_encoding) as f:
-                f.write(content)
+            convert_file(self.input_file, self.output_file,
+                         self.source_encoding, self.target_encoding,
+                         progress_callback=lambda n: self.report_progress(n, total))
             
-            self.progress_updated.emit(100)
+            self.report_progress(total, total)
             self.conversion_finished.emit(f"转换成功！文件已保存到：{self.output_file}")
             
         except UnicodeDecodeError as e:
@@ -44,18 +79,49 @@ class EncodingConverter(QThread):
         except Exception as e:
             self.error_occurred.emit(f"转换失败：{str(e)}")
 
+
+class BatchConverter(QThread):
+    """批量转换工作线程"""
+    progress_updated = pyqtSignal(int)
+    batch_finished = pyqtSignal(list)
+    error_occurred = pyqtSignal(str)
+    
+    def __init__(self, root_dir, patterns, target_encoding, output_dir=None,
+                 source_encoding=None, min_confidence=DEFAULT_MIN_CONFIDENCE):
+        super().__init__()
+        self.root_dir = root_dir
+        self.patterns = patterns
+        self.target_encoding = target_encoding
+        self.output_dir = output_dir
+        self.source_encoding = source_encoding
+        self.min_confidence = min_confidence
+    
+    def run(self):
+        try:
+            results = convert_directory(
+                self.root_dir, self.patterns, self.target_encoding,
+                output_dir=self.output_dir, source_encoding=self.source_encoding,
+                min_confidence=self.min_confidence,
+                progress_callback=lambda done, total: self.progress_updated.emit(
+                    int(done * 100 / total)))
+            self.batch_finished.emit(results)
+        except Exception as e:
+            self.error_occurred.emit(f"批量转换失败：{str(e)}")
+
 class EncodingConverterGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.input_file_path = ""
         self.output_file_path = ""
         self.conversion_thread = None
+        self.batch_thread = None
+        self.detect_thread = None
         
         self.init_ui()
         
     def init_ui(self):
         self.setWindowTitle("文本文件编码转换器")
-        self.setGeometry(300, 300, 600, 500)
+        self.setGeometry(300, 300, 600, 650)
         
         # 创建中央窗口部件
         central_widget = QWidget()
@@ -127,6 +193,47 @@ class EncodingConverterGUI(QMainWindow):
         
         main_layout.addWidget(encoding_group)
         
+        # 批量转换组
+        batch_group = QGroupBox("批量转换")
+        batch_layout = QGridLayout()
+        batch_group.setLayout(batch_layout)
+        
+        batch_layout.addWidget(QLabel("源目录:"), 0, 0)
+        self.batch_dir_edit = QLineEdit()
+        batch_layout.addWidget(self.batch_dir_edit, 0, 1)
+        
+        self.browse_batch_dir_btn = QPushButton("浏览...")
+        self.browse_batch_dir_btn.clicked.connect(self.browse_batch_dir)
+        batch_layout.addWidget(self.browse_batch_dir_btn, 0, 2)
+        
+        batch_layout.addWidget(QLabel("文件模式:"), 1, 0)
+        self.batch_patterns_edit = QLineEdit("*.txt")
+        self.batch_patterns_edit.setPlaceholderText("多个模式用分号分隔，例如 *.txt;*.c;*.h")
+        batch_layout.addWidget(self.batch_patterns_edit, 1, 1)
+        
+        batch_layout.addWidget(QLabel("输出目录:"), 2, 0)
+        self.batch_output_edit = QLineEdit()
+        self.batch_output_edit.setPlaceholderText("留空则原地转换")
+        batch_layout.addWidget(self.batch_output_edit, 2, 1)
+        
+        self.browse_batch_output_btn = QPushButton("浏览...")
+        self.browse_batch_output_btn.clicked.connect(self.browse_batch_output)
+        batch_layout.addWidget(self.browse_batch_output_btn, 2, 2)
+        
+        batch_layout.addWidget(QLabel("最低置信度:"), 3, 0)
+        self.min_confidence_spin = QDoubleSpinBox()
+        self.min_confidence_spin.setRange(0.0, 1.0)
+        self.min_confidence_spin.setSingleStep(0.05)
+        self.min_confidence_spin.setValue(DEFAULT_MIN_CONFIDENCE)
+        self.min_confidence_spin.setToolTip("自动检测的置信度低于此值的文件不转换，在报告中列为失败")
+        batch_layout.addWidget(self.min_confidence_spin, 3, 1)
+        
+        self.batch_convert_btn = QPushButton("批量转换")
+        self.batch_convert_btn.clicked.connect(self.start_batch_conversion)
+        batch_layout.addWidget(self.batch_convert_btn, 1, 2)
+        
+        main_layout.addWidget(batch_group)
+        
         # 预览区域
         preview_group = QGroupBox("文件预览")
         preview_layout = QVBoxLayout()
@@ -183,28 +290,43 @@ class EncodingConverterGUI(QMainWindow):
             self.output_file_path = file_path
             self.output_file_edit.setText(file_path)
     
+    def browse_batch_dir(self):
+        dir_path = QFileDialog.getExistingDirectory(self, "选择源目录")
+        if dir_path:
+            self.batch_dir_edit.setText(dir_path)
+    
+    def browse_batch_output(self):
+        dir_path = QFileDialog.getExistingDirectory(self, "选择输出目录")
+        if dir_path:
+            self.batch_output_edit.setText(dir_path)
+    
     def detect_encoding(self):
         if not self.input_file_path:
             QMessageBox.warning(self, "警告", "请先选择输入文件！")
             return
         
-        try:
-            with open(self.input_file_path, 'rb') as f:
-                raw_data = f.read(10000)  # 读取前10000字节进行检测
-            
-            result = chardet.detect(raw_data)
-            detected_encoding = result['encoding']
-            confidence = result['confidence']
-            
-            if detected_encoding:
-                # 设置检测到的编码
-                self.source_encoding_combo.setCurrentText(detected_encoding.lower())
-                self.status_label.setText(f"检测到编码: {detected_encoding} (置信度: {confidence:.2%})")
-            else:
-                self.status_label.setText("无法检测编码")
-                
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"编码检测失败：{str(e)}")
+        self.detect_btn.setEnabled(False)
+        self.status_label.setText("正在检测编码...")
+        self.detect_thread = EncodingDetector(self.input_file_path)
+        self.detect_thread.detection_finished.connect(self.on_detection_finished)
+        self.detect_thread.error_occurred.connect(self.on_detection_error)
+        self.detect_thread.start()
+    
+    def on_detection_finished(self, detected_encoding, confidence):
+        self.detect_btn.setEnabled(True)
+        if detected_encoding:
+            # 设置检测到的编码（不在列表中的编码，例如gb18030，先加入列表）
+            if self.source_encoding_combo.findText(detected_encoding) < 0:
+                self.source_encoding_combo.addItem(detected_encoding)
+            self.source_encoding_combo.setCurrentText(detected_encoding)
+            self.status_label.setText(f"检测到编码: {detected_encoding} (置信度: {confidence:.2%})")
+        else:
+            self.status_label.setText("无法检测编码")
+    
+    def on_detection_error(self, error_message):
+        self.detect_btn.setEnabled(True)
+        self.status_label.setText(error_message)
+        QMessageBox.critical(self, "错误", error_message)
     
     def preview_file(self):
         if not self.input_file_path:
@@ -214,11 +336,11 @@ class EncodingConverterGUI(QMainWindow):
             # 尝试用当前选择的编码读取文件
             encoding = self.source_encoding_combo.currentText()
             if encoding == 'auto-detect':
-                # 自动检测编码
+                # 预览只按开头的一段数据检测（完整检测要读完整个文件），不准时以转换前的检测为准
                 with open(self.input_file_path, 'rb') as f:
-                    raw_data = f.read(1000)
-                result = chardet.detect(raw_data)
-                encoding = result['encoding'] or 'utf-8'
+                    head = f.read(SAMPLE_SIZE)
+                    at_end = not f.read(1)
+                encoding = detect_bytes_encoding(head, final=at_end)[0] or 'utf-8'
             
             with open(self.input_file_path, 'r', encoding=encoding) as f:
                 content = f.read(500)  # 只读取前500个字符进行预览
@@ -246,19 +368,9 @@ class EncodingConverterGUI(QMainWindow):
             QMessageBox.information(self, "提示", "源编码和目标编码相同，无需转换！")
             return
         
-        # 处理自动检测编码
+        # 自动检测编码在转换线程中进行
         if source_encoding == 'auto-detect':
-            try:
-                with open(self.input_file_path, 'rb') as f:
-                    raw_data = f.read(10000)
-                result = chardet.detect(raw_data)
-                source_encoding = result['encoding']
-                if not source_encoding:
-                    QMessageBox.critical(self, "错误", "无法自动检测源文件编码！")
-                    return
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"编码检测失败：{str(e)}")
-                return
+            source_encoding = None
         
         # 开始转换
         self.convert_btn.setEnabled(False)
@@ -290,6 +402,68 @@ class EncodingConverterGUI(QMainWindow):
         self.convert_btn.setEnabled(True)
         QMessageBox.critical(self, "转换失败", error_message)
 
+    def start_batch_conversion(self):
+        root_dir = self.batch_dir_edit.text().strip()
+        if not root_dir or not os.path.isdir(root_dir):
+            QMessageBox.warning(self, "警告", "请选择有效的源目录！")
+            return
+        
+        patterns = [p.strip() for p in self.batch_patterns_edit.text().split(';') if p.strip()]
+        if not patterns:
+            QMessageBox.warning(self, "警告", "请输入文件模式！")
+            return
+        
+        output_dir = self.batch_output_edit.text().strip() or None
+        source_encoding = self.source_encoding_combo.currentText()
+        if source_encoding == 'auto-detect':
+            source_encoding = None
+        target_encoding = self.target_encoding_combo.currentText()
+        
+        self.batch_convert_btn.setEnabled(False)
+        self.convert_btn.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+        self.status_label.setText("正在批量转换...")
+        
+        self.batch_thread = BatchConverter(
+            root_dir, patterns, target_encoding, output_dir, source_encoding,
+            self.min_confidence_spin.value())
+        self.batch_thread.progress_updated.connect(self.progress_bar.setValue)
+        self.batch_thread.batch_finished.connect(self.on_batch_finished)
+        self.batch_thread.error_occurred.connect(self.on_batch_error)
+        self.batch_thread.start()
+    
+    def on_batch_finished(self, results):
+        self.progress_bar.setVisible(False)
+        self.batch_convert_btn.setEnabled(True)
+        self.convert_btn.setEnabled(True)
+        
+        counts = {'converted': 0, 'skipped': 0, 'error': 0}
+        for report in results:
+            counts[report['status']] += 1
+        
+        # 报告写在转换目录旁边而不是里面，免得下次按 * 或 *.csv 转换时被当作输入
+        tree = os.path.abspath(self.batch_thread.output_dir or self.batch_thread.root_dir)
+        report_path = os.path.join(os.path.dirname(tree),
+                                   f"{os.path.basename(tree)}_encoding_report.csv")
+        try:
+            write_report(results, report_path)
+        except Exception as e:
+            report_path = f"写入失败：{str(e)}"
+        
+        message = (f"共 {len(results)} 个文件：转换 {counts['converted']}，"
+                   f"跳过 {counts['skipped']}，失败 {counts['error']}\n"
+                   f"报告：{report_path}")
+        self.status_label.setText(message.split('\n')[0])
+        QMessageBox.information(self, "批量转换完成", message)
+    
+    def on_batch_error(self, error_message):
+        self.status_label.setText(error_message)
+        self.progress_bar.setVisible(False)
+        self.batch_convert_btn.setEnabled(True)
+        self.convert_btn.setEnabled(True)
+        QMessageBox.critical(self, "批量转换失败", error_message)
+
 def main():
     app = QApplication(sys.argv)
     
@@ -0,0 +1,627 @@
+"""
+文本文件编码检测与转换（不依赖Qt，可作为库或命令行使用）
+
+用法示例：
+    python encoding_tools.py check src/ -p "*.c" -p "*.h"
+    python encoding_tools.py check --expect utf-8 docs/
+    python encoding_tools.py convert legacy.txt -o new.txt -t utf-8
+    python encoding_tools.py convert src/ --output-dir out/ --report report.csv
+    python encoding_tools.py audit src/ -f gbk -p "*.c" -n 5
+    cat legacy.txt | python encoding_tools.py convert - -t utf-8 > new.txt
+
+chardet只在快速路径（BOM、ASCII/UTF-8校验）无法确定编码时才导入。
+"""
+
+import os
+import sys
+import csv
+import codecs
+import fnmatch
+import shutil
+import threading
+
+# 流式转换时每次读取的字节数
+CHUNK_SIZE = 1024 * 1024
+
+
+def transcode_stream(src, dst, source_encoding, target_encoding,
+                     chunk_size=CHUNK_SIZE, progress_callback=None):
+    """按固定大小的块流式转换编码，返回处理的字节数
+
+    使用 codecs 的增量解码器/编码器，跨块边界被截断的多字节序列
+    会留在解码器内部缓冲区中，与下一块拼接后再解码。
+    progress_callback(已处理字节数) 在每块处理后调用。
+    """
+    decoder = codecs.getincrementaldecoder(source_encoding)('strict')
+    encoder = codecs.getincrementalencoder(target_encoding)('strict')
+    processed = 0
+
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        processed += len(chunk)
+        text = decoder.decode(chunk)
+        if text:
+            dst.write(encoder.encode(text))
+        if progress_callback:
+            progress_callback(processed)
+
+    # 冲刷解码器/编码器中剩余的数据（不完整的序列会在这里报错）
+    tail = encoder.encode(decoder.decode(b'', final=True), final=True)
+    if tail:
+        dst.write(tail)
+
+    return processed
+
+
+def transcode_to_temp(src, output_file, source_encoding, target_encoding,
+                      progress_callback=None):
+    """把输入流转换编码后写入输出文件旁的临时文件，返回临时文件路径
+
+    转换失败时删除临时文件并抛出异常。
+    """
+    temp_file = output_file + '.converting'
+    try:
+        with open(temp_file, 'wb') as dst:
+            transcode_stream(src, dst, source_encoding, target_encoding,
+                             progress_callback=progress_callback)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return temp_file
+
+
+def replace_with_temp(temp_file, output_file):
+    """用转换好的临时文件替换输出文件，失败时删除临时文件"""
+    try:
+        os.replace(temp_file, output_file)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def convert_stream_to_file(src, output_file, source_encoding, target_encoding,
+                           progress_callback=None):
+    """把输入流转换编码后写入文件
+
+    先写入临时文件，成功后再替换，失败时不会留下半截的输出文件。
+    """
+    temp_file = transcode_to_temp(src, output_file, source_encoding, target_encoding,
+                                  progress_callback)
+    replace_with_temp(temp_file, output_file)
+
+
+def convert_file(input_file, output_file, source_encoding, target_encoding,
+                 progress_callback=None):
+    """转换单个文件的编码，输出路径可以与输入路径相同
+
+    替换在关闭输入文件之后进行：Windows 上不能替换仍被打开的文件。
+    """
+    with open(input_file, 'rb') as src:
+        temp_file = transcode_to_temp(src, output_file, source_encoding, target_encoding,
+                                      progress_callback)
+    replace_with_temp(temp_file, output_file)
+
+
+# 常见BOM及对应编码（UTF-32需在UTF-16之前检查，二者的LE BOM前缀相同）
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# chardet采样：每个采样点读取的字节数和采样点数量
+SAMPLE_SIZE = 16 * 1024
+SAMPLE_COUNT = 5
+
+# 本次运行中已检测过的文件：(路径, 大小, 修改时间) -> (编码, 置信度)
+_detection_cache = {}
+
+
+def detect_bom(head):
+    """根据文件开头的字节检测BOM，返回编码或None"""
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    return None
+
+
+def validate_utf8(chunks, final=True):
+    """严格校验一系列字节块，返回 'ascii'、'utf-8' 或None（不是合法UTF-8）
+
+    纯ASCII块用 bytes.isascii() 判断，其余交给C实现的UTF-8解码器，
+    遇到第一个非法字节就提前返回。final为False时允许末尾是被截断的字符。
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')('strict')
+    all_ascii = True
+    try:
+        for chunk in chunks:
+            if all_ascii and chunk.isascii():
+                continue
+            all_ascii = False
+            decoder.decode(chunk)
+        decoder.decode(b'', final=final)
+    except UnicodeDecodeError:
+        return None
+    return 'ascii' if all_ascii else 'utf-8'
+
+
+def detect_with_chardet(samples):
+    """用chardet检测采样数据的编码，返回 (编码, 置信度)"""
+    # chardet导入较慢，只在快速路径失败时才导入
+    from chardet import UniversalDetector
+
+    detector = UniversalDetector()
+    for sample in samples:
+        detector.feed(sample)
+        if detector.done:
+            break
+    detector.close()
+    encoding = detector.result['encoding']
+    return (encoding.lower() if encoding else None,
+            detector.result['confidence'])
+
+
+def read_samples(f, file_size):
+    """从文件中均匀分布的多个位置读取采样数据"""
+    if file_size <= SAMPLE_SIZE * SAMPLE_COUNT:
+        f.seek(0)
+        return [f.read()]
+
+    samples = []
+    step = (file_size - SAMPLE_SIZE) // (SAMPLE_COUNT - 1)
+    for i in range(SAMPLE_COUNT):
+        offset = i * step
+        f.seek(offset)
+        sample = f.read(SAMPLE_SIZE)
+        if offset > 0:
+            # 从换行符之后开始，避免从多字节字符中间截断
+            newline = sample.find(b'\n')
+            if newline != -1:
+                sample = sample[newline + 1:]
+        samples.append(sample)
+    return samples
+
+
+def detect_file_encoding(file_path):
+    """分层检测文件编码，返回 (编码, 置信度)，无法检测时编码为None
+
+    依次尝试：BOM -> 整个文件的严格ASCII/UTF-8校验 -> 多处采样的chardet。
+    结果按 (路径, 大小, 修改时间) 缓存，同一文件在本次运行中只检测一次。
+    """
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key in _detection_cache:
+        return _detection_cache[key]
+
+    with open(file_path, 'rb') as f:
+        encoding = detect_bom(f.read(4))
+        if encoding:
+            result = (encoding, 1.0)
+        else:
+            f.seek(0)
+            encoding = validate_utf8(iter(lambda: f.read(CHUNK_SIZE), b''))
+            if encoding:
+                result = (encoding, 1.0)
+            else:
+                result = detect_with_chardet(read_samples(f, stat.st_size))
+
+    _detection_cache[key] = result
+    return result
+
+
+def detect_bytes_encoding(data, final=True):
+    """检测一段字节数据的编码（用于无法回读的流），返回 (编码, 置信度)
+
+    final为False表示data只是流的开头，末尾可能截断了多字节字符。
+    """
+    encoding = detect_bom(data) or validate_utf8([data], final=final)
+    if encoding:
+        return encoding, 1.0
+    return detect_with_chardet([data])
+
+
+# 自动检测的置信度低于此值时不转换（chardet 对短文件可能给出置信度很低的错误结果，
+# 中英混排的GBK文件正确检测时也只有0.45左右）
+DEFAULT_MIN_CONFIDENCE = 0.3
+
+# 批量转换报告的列
+REPORT_FIELDS = ['path', 'encoding', 'confidence', 'status', 'message']
+
+_ASCII_BYTES = bytes(range(128))
+
+
+def same_bytes_after_conversion(source_encoding, target_encoding):
+    """判断从源编码转换到目标编码后字节是否不变（可以直接跳过）"""
+    source = codecs.lookup(source_encoding).name
+    target = codecs.lookup(target_encoding).name
+    if source == target:
+        return True
+    # 纯ASCII文件在任何兼容ASCII的目标编码下内容都不变
+    if source == 'ascii':
+        try:
+            return _ASCII_BYTES.decode('ascii').encode(target) == _ASCII_BYTES
+        except UnicodeError:
+            return False
+    return False
+
+
+def find_files(root_dir, patterns):
+    """递归查找目录中文件名匹配任一模式的文件"""
+    matched = []
+    for root, _, files in os.walk(root_dir):
+        for name in files:
+            if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                matched.append(os.path.join(root, name))
+    matched.sort()
+    return matched
+
+
+def convert_one_file(task):
+    """批量转换中处理单个文件（在工作进程中运行），返回报告行
+
+    自动检测的置信度低于 min_confidence 时不转换，报告为错误。
+    """
+    input_file, output_file, source_encoding, target_encoding, min_confidence = task
+    report = {'path': input_file, 'encoding': source_encoding, 'confidence': None,
+              'status': 'error', 'message': ''}
+    try:
+        if source_encoding is None:
+            source_encoding, confidence = detect_file_encoding(input_file)
+            report['encoding'] = source_encoding
+            report['confidence'] = confidence
+            if not source_encoding:
+                report['message'] = '无法检测编码'
+                return report
+            if confidence < min_confidence:
+                report['message'] = f'检测置信度过低（{confidence:.2f}），未转换'
+                return report
+
+        if output_file != input_file:
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+        if same_bytes_after_conversion(source_encoding, target_encoding):
+            # 内容无需转换；输出到其他目录时原样复制以保持目录完整
+            if output_file != input_file:
+                shutil.copy2(input_file, output_file)
+            report['status'] = 'skipped'
+            report['message'] = '已是目标编码'
+            return report
+
+        convert_file(input_file, output_file, source_encoding, target_encoding)
+        report['status'] = 'converted'
+    except UnicodeDecodeError as e:
+        report['message'] = f"源编码解码错误：{str(e)}"
+    except UnicodeEncodeError as e:
+        report['message'] = f"目标编码编码错误：{str(e)}"
+    except Exception as e:
+        report['message'] = f"转换失败：{str(e)}"
+    return report
+
+
+def convert_directory(root_dir, patterns, target_encoding, output_dir=None,
+                      source_encoding=None, workers=None, progress_callback=None,
+                      min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """批量转换目录中匹配模式的文件，返回每个文件的报告行列表
+
+    source_encoding为None时逐个文件自动检测，置信度低于 min_confidence 的文件
+    不转换（报告为错误）；output_dir为None时原地转换，
+    否则在output_dir中保持原有目录结构。文件在多个进程中并行处理，
+    progress_callback(已完成数, 总数) 在每个文件完成后调用。
+    """
+    files = find_files(root_dir, patterns)
+    tasks = []
+    for input_file in files:
+        if output_dir:
+            rel_path = os.path.relpath(input_file, root_dir)
+            output_file = os.path.join(output_dir, rel_path)
+        else:
+            output_file = input_file
+        tasks.append((input_file, output_file, source_encoding, target_encoding,
+                      min_confidence))
+
+    return run_in_pool(convert_one_file, tasks, workers, progress_callback)
+
+
+def run_in_pool(func, tasks, workers=None, progress_callback=None):
+    """在进程池中对每个任务调用func，按任务顺序返回结果列表"""
+    results = []
+    if not tasks:
+        return results
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 小文件很多时按批分发，减少进程间通信开销
+        chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 8))
+        for result in executor.map(func, tasks, chunksize=chunksize):
+            results.append(result)
+            if progress_callback:
+                progress_callback(len(results), len(tasks))
+    return results
+
+
+def write_report(results, report_path):
+    """将批量转换报告写入CSV文件"""
+    # 使用utf-8-sig，方便直接用Excel打开
+    with open(report_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+# 审计时默认报告的错误位置数量
+MAX_REPORTED_ERRORS = 10
+
+# 审计解码时标记错误位置的字符：严格解码器不会输出孤立的代理字符
+_AUDIT_MARK = '\udcff'
+_audit_state = threading.local()
+
+
+def _audit_error_handler(e):
+    """审计用的解码错误处理：记录出错位置后跳过出错字节
+
+    只为前 limit 个错误记录 (start, end, 字节) 并在输出中留下标记，之后的错误只计数。
+    """
+    state = _audit_state
+    state.count += 1
+    if len(state.found) < state.limit:
+        state.found.append((e.start, e.end, e.object[e.start:e.end]))
+        return _AUDIT_MARK, e.end
+    return '', e.end
+
+
+codecs.register_error('encoding_tools.audit', _audit_error_handler)
+
+
+def audit_stream(src, encoding, max_errors=MAX_REPORTED_ERRORS, chunk_size=CHUNK_SIZE):
+    """用严格解码器流式扫描数据，找出无法解码的字节
+
+    返回 (错误总数, 前max_errors个错误)，每个错误是字典：
+    offset（字节偏移，从0开始）、line、column（行列号，从1开始，列按字符计）、
+    bytes（出错字节的十六进制）。错误由自定义的错误处理函数记录并跳过，
+    每个块只解码一遍；记满 max_errors 个之后只计数。只保留一个块的数据在内存中。
+    """
+    decoder = codecs.getincrementaldecoder(encoding)('encoding_tools.audit')
+    state = _audit_state
+    state.count = 0
+    errors = []
+    line, column = 1, 0
+    offset = 0  # 下一个块在文件中的起始偏移
+
+    def advance(text):
+        nonlocal line, column
+        newlines = text.count('\n')
+        if newlines:
+            line += newlines
+            column = len(text) - text.rfind('\n') - 1
+        else:
+            column += len(text)
+
+    def feed(data, final):
+        # 错误位置相对于解码器内部缓冲的未完成字节加上本次输入，据此换算出文件偏移
+        base = offset - len(decoder.getstate()[0])
+        state.found = []
+        state.limit = max_errors - len(errors)
+        text = decoder.decode(data, final)
+        pos = 0
+        for start, end, bad in state.found:
+            mark = text.index(_AUDIT_MARK, pos)
+            advance(text[pos:mark])
+            errors.append({'offset': base + start, 'line': line, 'column': column + 1,
+                           'bytes': bad.hex()})
+            pos = mark + 1
+        advance(text[pos:] if pos else text)
+
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        feed(chunk, False)
+        offset += len(chunk)
+    feed(b'', True)
+    return state.count, errors
+
+
+def audit_file(file_path, encoding, max_errors=MAX_REPORTED_ERRORS):
+    """审计单个文件（只读），返回报告字典"""
+    report = {'path': file_path, 'encoding': encoding, 'size': None,
+              'error_count': None, 'errors': [], 'message': ''}
+    try:
+        with open(file_path, 'rb') as f:
+            report['error_count'], report['errors'] = audit_stream(f, encoding, max_errors)
+            report['size'] = f.tell()
+    except (OSError, LookupError, UnicodeError) as e:
+        # UnicodeError：例如 utf-32 / utf-16 流缺少BOM，解码器直接拒绝整个流
+        report['message'] = str(e)
+    return report
+
+
+def audit_one_file(task):
+    """进程池中审计单个文件"""
+    return audit_file(*task)
+
+
+def audit_files(files, encoding, max_errors=MAX_REPORTED_ERRORS, workers=None,
+                progress_callback=None):
+    """在多个进程中并行审计文件，返回每个文件的报告字典列表"""
+    tasks = [(file_path, encoding, max_errors) for file_path in files]
+    return run_in_pool(audit_one_file, tasks, workers, progress_callback)
+
+
+class PrefixedStream:
+    """在流前面拼接一段已读取的数据，用于检测编码后继续流式处理stdin"""
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        if not self.prefix:
+            return self.stream.read(size)
+        if size < 0:
+            data, self.prefix = self.prefix + self.stream.read(), b''
+        else:
+            data, self.prefix = self.prefix[:size], self.prefix[size:]
+        return data
+
+
+def collect_files(paths, patterns):
+    """展开命令行给出的路径：目录按模式递归查找，文件原样保留"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(find_files(path, patterns))
+        else:
+            files.append(path)
+    return files
+
+
+def command_check(args):
+    """check子命令：检测文件编码，可选检查是否都符合期望的编码"""
+    status = 0
+    for file_path in collect_files(args.paths, args.patterns):
+        try:
+            encoding, confidence = detect_file_encoding(file_path)
+        except OSError as e:
+            print(f"{file_path}\t错误：{e}", file=sys.stderr)
+            status = 1
+            continue
+        print(f"{file_path}\t{encoding}\t{confidence:.2f}")
+        if args.expect and not (encoding and
+                                same_bytes_after_conversion(encoding, args.expect)):
+            status = 1
+    return status
+
+
+def command_convert(args):
+    """convert子命令：转换单个文件、stdin或整个目录"""
+    if args.input != '-' and os.path.isdir(args.input):
+        results = convert_directory(
+            args.input, args.patterns, args.target, output_dir=args.output_dir,
+            source_encoding=args.source, workers=args.workers,
+            min_confidence=args.min_confidence)
+        if args.report:
+            write_report(results, args.report)
+        counts = {'converted': 0, 'skipped': 0, 'error': 0}
+        for report in results:
+            counts[report['status']] += 1
+            if report['status'] == 'error':
+                print(f"{report['path']}\t{report['message']}", file=sys.stderr)
+        print(f"共 {len(results)} 个文件：转换 {counts['converted']}，"
+              f"跳过 {counts['skipped']}，失败 {counts['error']}", file=sys.stderr)
+        return 1 if counts['error'] else 0
+
+    source_encoding, confidence = args.source, 1.0
+    if args.input == '-':
+        src = sys.stdin.buffer
+        if not source_encoding:
+            head = src.read(SAMPLE_SIZE * SAMPLE_COUNT)
+            at_end = len(head) < SAMPLE_SIZE * SAMPLE_COUNT
+            source_encoding, confidence = detect_bytes_encoding(head, final=at_end)
+            src = PrefixedStream(head, src)
+    else:
+        src = None
+        if not source_encoding:
+            source_encoding, confidence = detect_file_encoding(args.input)
+
+    if not source_encoding:
+        print("错误：无法自动检测源编码，请用 --source 指定", file=sys.stderr)
+        return 1
+    if confidence < args.min_confidence:
+        print(f"错误：检测到 {source_encoding}，但置信度过低（{confidence:.2f}），"
+              f"请用 --source 指定", file=sys.stderr)
+        return 1
+
+    try:
+        if src is None and args.output != '-':
+            convert_file(args.input, args.output, source_encoding, args.target)
+        elif src is None:
+            with open(args.input, 'rb') as f:
+                transcode_stream(f, sys.stdout.buffer, source_encoding, args.target)
+        elif args.output != '-':
+            convert_stream_to_file(src, args.output, source_encoding, args.target)
+        else:
+            transcode_stream(src, sys.stdout.buffer, source_encoding, args.target)
+        sys.stdout.buffer.flush()
+    except UnicodeError as e:
+        print(f"错误：{source_encoding} -> {args.target}：{e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"错误：{e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def command_audit(args):
+    """audit子命令：报告在给定源编码下无法解码的文件及字节位置"""
+    codecs.lookup(args.source)
+    files = collect_files(args.paths, args.patterns)
+    results = audit_files(files, args.source, args.max_errors, args.workers)
+
+    failed = 0
+    for report in results:
+        if report['message']:
+            failed += 1
+            print(f"{report['path']}\t错误：{report['message']}")
+        elif report['error_count']:
+            failed += 1
+            print(f"{report['path']}\t{report['error_count']} 处无法解码")
+            for error in report['errors']:
+                print(f"  偏移 {error['offset']}（行 {error['line']}，"
+                      f"列 {error['column']}）：{error['bytes']}")
+    print(f"共 {len(results)} 个文件，{failed} 个无法按 {args.source} 解码",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='文本文件编码检测与转换')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    check_parser = subparsers.add_parser('check', help='检测文件编码')
+    check_parser.add_argument('paths', nargs='+', help='文件或目录')
+    check_parser.add_argument('-p', '--pattern', dest='patterns', action='append',
+                              help='目录中要包含的文件模式，可重复（默认 *）')
+    check_parser.add_argument('--expect', help='期望的编码，有不符合的文件时返回1')
+    check_parser.set_defaults(func=command_check)
+
+    convert_parser = subparsers.add_parser('convert', help='转换文件编码')
+    convert_parser.add_argument('input', help='输入文件、目录，或 - 表示stdin')
+    convert_parser.add_argument('-o', '--output', default='-',
+                                help='输出文件，默认 - 表示stdout（仅单个文件）')
+    convert_parser.add_argument('-f', '--source', help='源编码，默认自动检测')
+    convert_parser.add_argument('-t', '--target', default='utf-8', help='目标编码（默认 utf-8）')
+    convert_parser.add_argument('-p', '--pattern', dest='patterns', action='append',
+                                help='目录中要包含的文件模式，可重复（默认 *）')
+    convert_parser.add_argument('--output-dir', help='目录模式的输出目录，默认原地转换')
+    convert_parser.add_argument('--report', help='目录模式下写入CSV报告的路径')
+    convert_parser.add_argument('-j', '--workers', type=int, help='并行进程数')
+    convert_parser.add_argument('--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE,
+                                help='自动检测的最低置信度，低于此值的文件不转换'
+                                     f'（默认 {DEFAULT_MIN_CONFIDENCE}）')
+    convert_parser.set_defaults(func=command_convert)
+
+    audit_parser = subparsers.add_parser('audit', help='只读扫描，报告无法按源编码解码的位置')
+    audit_parser.add_argument('paths', nargs='+', help='文件或目录')
+    audit_parser.add_argument('-f', '--source', required=True, help='源编码')
+    audit_parser.add_argument('-p', '--pattern', dest='patterns', action='append',
+                              help='目录中要包含的文件模式，可重复（默认 *）')
+    audit_parser.add_argument('-n', '--max-errors', type=int, default=MAX_REPORTED_ERRORS,
+                              help=f'每个文件最多报告的错误位置数（默认 {MAX_REPORTED_ERRORS}）')
+    audit_parser.add_argument('-j', '--workers', type=int, help='并行进程数')
+    audit_parser.set_defaults(func=command_audit)
+
+    args = parser.parse_args(argv)
+    args.patterns = args.patterns or ['*']
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,21 +1,61 @@
 import sys
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QLineEdit, 
-                             QFileDialog, QTextEdit, QMessageBox)
-from PyQt5.QtCore import Qt
-from PyPDF2 import PdfReader, PdfWriter
+                             QFileDialog, QTextEdit, QMessageBox, QProgressBar,
+                             QCheckBox)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import os
 
+from pdf_split_tools import (RULE_HELP, DEFAULT_OPTIMIZE, parse_split_rules, plan_split,
+                             split_pdf)
+
+
+class SplitThread(QThread):
+    """分割工作线程，各部分由进程池并行写出"""
+    progress_updated = pyqtSignal(int)
+    log_message = pyqtSignal(str)
+    split_finished = pyqtSignal(int)
+    error_occurred = pyqtSignal(str)
+    
+    def __init__(self, pdf_path, rules, output_dir, optimize=()):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.rules = rules
+        self.output_dir = output_dir
+        self.optimize = optimize
+        
+    def run(self):
+        try:
+            parts, skipped, total_pages = plan_split(self.pdf_path, self.rules,
+                                                     self.output_dir)
+            self.log_message.emit(f'PDF总页数: {total_pages}，将生成 {len(parts)} 个文件')
+            for rule in skipped:
+                self.log_message.emit(f'警告: 规则 {rule} 超出页码范围或无法应用，跳过')
+            
+            def progress(done, total):
+                self.progress_updated.emit(int(done * 100 / total))
+            
+            results = split_pdf(self.pdf_path, parts, progress_callback=progress,
+                                optimize=self.optimize)
+            for result in results:
+                self.log_message.emit(
+                    f"✓ 已保存: {os.path.basename(result['path'])} "
+                    f"({result['pages']} 页, {result['size'] / 1024:.0f} KB)")
+            self.split_finished.emit(len(results))
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
 
 class PDFSplitterGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.pdf_path = None
+        self.split_thread = None
         self.init_ui()
         
     def init_ui(self):
         self.setWindowTitle('PDF 分页工具')
-        self.setGeometry(100, 100, 600, 400)
+        self.setGeometry(100, 100, 600, 480)
         
         # 创建中央部件
         central_widget = QWidget()
@@ -35,19 +75,13 @@ class PDFSplitterGUI(QMainWindow):
         
         # 分页规则输入
         rule_layout = QVBoxLayout()
-        rule_label = QLabel('分页规则 (例如: 1-5,6,7-9):')
+        rule_label = QLabel('分页规则 (例如: 1-5,6,7-9 或 every 10):')
         rule_label.setStyleSheet('font-weight: bold; margin-top: 10px;')
         self.rule_input = QLineEdit()
         self.rule_input.setPlaceholderText('输入页码范围，用逗号分隔...')
         
         # 说明文本
-        help_text = QLabel(
-            '说明：\n'
-            '• 单页: 6\n'
-            '• 页码范围: 1-5\n'
-            '• 多个部分用逗号分隔: 1-5,6,7-9\n'
-            '• 这将生成3个PDF文件'
-        )
+        help_text = QLabel('说明：\n' + RULE_HELP)
         help_text.setStyleSheet('color: #666; font-size: 11px; padding: 5px;')
         
         rule_layout.addWidget(rule_label)
@@ -66,8 +100,17 @@ class PDFSplitterGUI(QMainWindow):
         output_layout.addWidget(self.output_path, stretch=1)
         output_layout.addWidget(output_btn)
         
+        # 输出优化选项
+        optimize_layout = QHBoxLayout()
+        self.optimize_check = QCheckBox('优化输出（合并相同对象、压缩流）')
+        self.optimize_check.setChecked(True)
+        self.prune_check = QCheckBox('删除未使用的字体和图像')
+        optimize_layout.addWidget(self.optimize_check)
+        optimize_layout.addWidget(self.prune_check)
+        optimize_layout.addStretch()
+        
         # 执行按钮
-        execute_btn = QPushButton('开始分割')
+        self.execute_btn = execute_btn = QPushButton('开始分割')
         execute_btn.setStyleSheet(
             'QPushButton {'
             '    background-color: #4CAF50;'
@@ -83,6 +126,10 @@ class PDFSplitterGUI(QMainWindow):
         )
         execute_btn.clicked.connect(self.split_pdf)
         
+        # 进度条
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        
         # 日志输出
         log_label = QLabel('执行日志:')
         log_label.setStyleSheet('font-weight: bold; margin-top: 10px;')
@@ -95,7 +142,9 @@ class PDFSplitterGUI(QMainWindow):
         layout.addLayout(rule_layout)
         layout.addWidget(output_label)
         layout.addLayout(output_layout)
+        layout.addLayout(optimize_layout)
         layout.addWidget(execute_btn)
+        layout.addWidget(self.progress_bar)
         layout.addWidget(log_label)
         layout.addWidget(self.log_text)
         
@@ -119,21 +168,6 @@ class PDFSplitterGUI(QMainWindow):
     def log(self, message):
         self.log_text.append(message)
         
-    def parse_page_ranges(self, rule_string):
-        """解析页码范围字符串，返回页码范围列表"""
-        ranges = []
-        parts = rule_string.replace(' ', '').split(',')
-        
-        for part in parts:
-            if '-' in part:
-                start, end = part.split('-')
-                ranges.append((int(start), int(end)))
-            else:
-                page = int(part)
-                ranges.append((page, page))
-                
-        return ranges
-        
     def split_pdf(self):
         # 验证输入
         if not self.pdf_path:
@@ -147,54 +181,45 @@ class PDFSplitterGUI(QMainWindow):
             
         try:
             # 解析分页规则
-            ranges = self.parse_page_ranges(rule_string)
-            self.log(f'\n开始分割PDF，共 {len(ranges)} 个部分...')
-            
-            # 读取PDF
-            reader = PdfReader(self.pdf_path)
-            total_pages = len(reader.pages)
-            self.log(f'PDF总页数: {total_pages}')
-            
-            # 确定输出目录
-            output_dir = self.output_path.text().strip()
-            if not output_dir:
-                output_dir = os.path.dirname(self.pdf_path)
-                
-            base_name = os.path.splitext(os.path.basename(self.pdf_path))[0]
-            
-            # 分割PDF
-            for idx, (start, end) in enumerate(ranges, 1):
-                # 验证页码范围
-                if start < 1 or end > total_pages:
-                    self.log(f'警告: 范围 {start}-{end} 超出页码范围，跳过')
-                    continue
-                    
-                writer = PdfWriter()
-                
-                # 添加页面 (PyPDF2使用0索引)
-                for page_num in range(start - 1, end):
-                    writer.add_page(reader.pages[page_num])
-                
-                # 保存文件
-                output_file = os.path.join(
-                    output_dir, 
-                    f'{base_name}_part{idx}_pages{start}-{end}.pdf'
-                )
-                
-                with open(output_file, 'wb') as f:
-                    writer.write(f)
-                
-                self.log(f'✓ 已保存: {os.path.basename(output_file)} (页 {start}-{end})')
-            
-            self.log('\n分割完成！')
-            QMessageBox.information(self, '成功', f'PDF分割完成！\n共生成 {len(ranges)} 个文件。')
-            
+            rules = parse_split_rules(rule_string)
         except ValueError as e:
             QMessageBox.critical(self, '错误', f'分页规则格式错误: {e}')
             self.log(f'错误: 分页规则格式错误 - {e}')
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'处理失败: {e}')
-            self.log(f'错误: {e}')
+            return
+        
+        self.log(f'\n开始分割PDF，共 {len(rules)} 条规则...')
+        
+        # 确定输出目录
+        output_dir = self.output_path.text().strip()
+        if not output_dir:
+            output_dir = os.path.dirname(self.pdf_path)
+        
+        self.execute_btn.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        
+        optimize = ()
+        if self.optimize_check.isChecked() or self.prune_check.isChecked():
+            optimize = DEFAULT_OPTIMIZE + (('prune',) if self.prune_check.isChecked() else ())
+        
+        self.split_thread = SplitThread(self.pdf_path, rules, output_dir, optimize)
+        self.split_thread.progress_updated.connect(self.progress_bar.setValue)
+        self.split_thread.log_message.connect(self.log)
+        self.split_thread.split_finished.connect(self.on_split_finished)
+        self.split_thread.error_occurred.connect(self.on_split_error)
+        self.split_thread.start()
+        
+    def on_split_finished(self, count):
+        self.execute_btn.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        self.log('\n分割完成！')
+        QMessageBox.information(self, '成功', f'PDF分割完成！\n共生成 {count} 个文件。')
+        
+    def on_split_error(self, message):
+        self.execute_btn.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        QMessageBox.critical(self, '错误', f'处理失败: {message}')
+        self.log(f'错误: {message}')
 
 
 def main():
@@ -0,0 +1,253 @@
+"""
+Nonogram随机题目生成与求解器基准测试
+
+用法示例：
+    python nonogram_bench.py generate corpus/ --size 50x50 --density 0.6 --count 20 --unique
+    python nonogram_bench.py run -o results_new.json --label new
+    python nonogram_bench.py run --class 100x100:0.65:5 --timeout 60
+    python nonogram_bench.py run --class 100x100:0.6:5 --probe-workers 4 -o results_mp.json
+    python nonogram_bench.py compare results_old.json results_new.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import statistics
+
+from solve_nonogram import solve_complete, grid_to_strings
+
+# 默认的题目类别: (名称, 宽, 高, 填充密度, 是否要求唯一解, 题目数量)
+DEFAULT_CLASSES = [
+    ('10x10-d50', 10, 10, 0.5, False, 20),
+    ('20x20-d50', 20, 20, 0.5, False, 10),
+    ('25x25-d50-unique', 25, 25, 0.5, True, 5),
+    ('30x30-d60', 30, 30, 0.6, False, 5),
+    ('50x50-d60', 50, 50, 0.6, False, 3),
+    ('100x100-d65', 100, 100, 0.65, False, 2),
+    ('100x100-d60', 100, 100, 0.6, False, 2),
+]
+
+# 结果中汇总的统计项
+BENCH_FIELDS = ['time', 'line_solves', 'probes', 'nodes', 'backtracks']
+
+
+def line_clues(cells):
+    """由一行格子（1=填充）计算提示"""
+    clues = []
+    run = 0
+    for cell in cells:
+        if cell == 1:
+            run += 1
+        elif run:
+            clues.append(run)
+            run = 0
+    if run:
+        clues.append(run)
+    return clues
+
+
+def random_puzzle(width, height, density=0.5, rng=None):
+    """按填充密度随机生成一个题目（必然有解，goal 为生成时的网格）"""
+    rng = rng or random.Random()
+    goal = [[1 if rng.random() < density else -1 for _ in range(width)]
+            for _ in range(height)]
+    return {'rows': [line_clues(row) for row in goal],
+            'columns': [line_clues([goal[i][j] for i in range(height)]) for j in range(width)],
+            'goal': goal}
+
+
+def generate_puzzle(width, height, density=0.5, unique=False, rng=None,
+                    max_attempts=50, check_timeout=30):
+    """生成题目；unique为True时重试直到求解器确认解唯一
+
+    唯一性检查受 check_timeout 秒限制，max_attempts 次都不唯一时抛出RuntimeError。
+    """
+    rng = rng or random.Random()
+    for _ in range(max_attempts):
+        puzzle = random_puzzle(width, height, density, rng)
+        if not unique:
+            return puzzle
+        solutions, status = solve_complete(puzzle['rows'], puzzle['columns'],
+                                           max_solutions=2, time_limit=check_timeout)
+        if status == 'complete' and len(solutions) == 1:
+            return puzzle
+    raise RuntimeError(f'{max_attempts} 次尝试都没有生成唯一解的 {width}x{height} 题目')
+
+
+def puzzle_to_json(puzzle, title=''):
+    """转换为 solve_nonogram 能读取的 JSON 题目格式"""
+    data = {'title': title, 'rows': puzzle['rows'], 'columns': puzzle['columns']}
+    if puzzle.get('goal'):
+        data['goal'] = grid_to_strings(puzzle['goal'])
+    return data
+
+
+def build_corpus(classes, seed=0):
+    """按类别生成固定随机种子的题目集，返回 {类别名: [题目, ...]}"""
+    corpus = {}
+    for name, width, height, density, unique, count in classes:
+        # 每个类别单独的随机数生成器，增删类别不影响其他类别的题目
+        rng = random.Random(f'{seed}:{name}')
+        corpus[name] = [generate_puzzle(width, height, density, unique, rng)
+                        for _ in range(count)]
+    return corpus
+
+
+def summarize(values):
+    return {'mean': statistics.mean(values), 'median': statistics.median(values),
+            'max': max(values), 'total': sum(values)}
+
+
+def run_benchmark(classes, seed=0, timeout=None, progress=None, probe_workers=None):
+    """对每个类别的题目计时求解，返回可保存为JSON的结果字典
+
+    probe_workers 大于1时使用多进程并行探测（进程池启动时间计入耗时）。
+    """
+    corpus = build_corpus(classes, seed)
+    results = {}
+    for name, width, height, density, unique, count in classes:
+        records = []
+        for index, puzzle in enumerate(corpus[name]):
+            stats = {}
+            start = time.perf_counter()
+            solutions, status = solve_complete(puzzle['rows'], puzzle['columns'],
+                                               max_solutions=2, time_limit=timeout,
+                                               stats=stats, probe_workers=probe_workers)
+            stats['time'] = time.perf_counter() - start
+            stats['status'] = status
+            records.append(stats)
+            if progress:
+                progress(name, index + 1, count, stats)
+
+        results[name] = {
+            'width': width, 'height': height, 'density': density, 'unique': unique,
+            'count': count,
+            'timeouts': sum(1 for r in records if r['status'] == 'timeout'),
+            'summary': {field: summarize([r[field] for r in records])
+                        for field in BENCH_FIELDS},
+            'puzzles': records,
+        }
+    return results
+
+
+def print_results(results):
+    print(f"{'类别':<20}{'题数':>6}{'平均耗时(s)':>14}{'最长(s)':>10}"
+          f"{'行求解':>12}{'探测':>10}{'回溯':>8}{'超时':>6}")
+    for name, result in results.items():
+        summary = result['summary']
+        print(f"{name:<20}{result['count']:>6}{summary['time']['mean']:>14.4f}"
+              f"{summary['time']['max']:>10.3f}{summary['line_solves']['mean']:>12.0f}"
+              f"{summary['probes']['mean']:>10.0f}{summary['backtracks']['mean']:>8.1f}"
+              f"{result['timeouts']:>6}")
+
+
+def print_comparison(old, new):
+    """对比两次基准测试结果（new 相对 old 的加速比）"""
+    print(f"{'类别':<20}{'旧耗时(s)':>12}{'新耗时(s)':>12}{'加速比':>8}"
+          f"{'旧行求解':>12}{'新行求解':>12}")
+    for name, result in new['classes'].items():
+        if name not in old['classes']:
+            continue
+        old_summary = old['classes'][name]['summary']
+        new_summary = result['summary']
+        old_time = old_summary['time']['total']
+        new_time = new_summary['time']['total']
+        speedup = old_time / new_time if new_time else float('inf')
+        print(f"{name:<20}{old_time:>12.3f}{new_time:>12.3f}{speedup:>8.2f}"
+              f"{old_summary['line_solves']['total']:>12}{new_summary['line_solves']['total']:>12}")
+
+
+def parse_class(text):
+    """解析 --class 参数：WxH:密度:数量[:unique]"""
+    parts = text.split(':')
+    width, height = (int(x) for x in parts[0].lower().split('x'))
+    density = float(parts[1]) if len(parts) > 1 else 0.5
+    count = int(parts[2]) if len(parts) > 2 else 5
+    unique = len(parts) > 3 and parts[3] == 'unique'
+    name = f"{width}x{height}-d{int(density * 100)}" + ('-unique' if unique else '')
+    return (name, width, height, density, unique, count)
+
+
+def command_generate(args):
+    width, height = (int(x) for x in args.size.lower().split('x'))
+    rng = random.Random(args.seed)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for index in range(args.count):
+        puzzle = generate_puzzle(width, height, args.density, args.unique, rng)
+        name = f'random_{width}x{height}_{index + 1:04d}'
+        path = os.path.join(args.output_dir, name + '.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(puzzle_to_json(puzzle, name), f)
+    print(f'已生成 {args.count} 个题目到 {args.output_dir}')
+    return 0
+
+
+def command_run(args):
+    classes = [parse_class(c) for c in args.classes] if args.classes else DEFAULT_CLASSES
+
+    def progress(name, done, total, stats):
+        print(f"  {name} {done}/{total}: {stats['time']:.3f}s {stats['status']}",
+              file=sys.stderr)
+
+    results = run_benchmark(classes, args.seed, args.timeout, progress, args.probe_workers)
+    print_results(results)
+    if args.output:
+        data = {'label': args.label, 'seed': args.seed, 'timeout': args.timeout,
+                'probe_workers': args.probe_workers, 'cpu_count': os.cpu_count(),
+                'python': platform.python_version(), 'machine': platform.machine(),
+                'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'classes': results}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        print(f'结果已保存到 {args.output}')
+    return 0
+
+
+def command_compare(args):
+    with open(args.old, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.new, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+    print_comparison(old, new)
+    return 0
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Nonogram随机题目生成与基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    gen_parser = subparsers.add_parser('generate', help='生成随机题目（JSON格式）')
+    gen_parser.add_argument('output_dir', help='输出目录')
+    gen_parser.add_argument('--size', default='20x20', help='尺寸 WxH（默认 20x20）')
+    gen_parser.add_argument('--density', type=float, default=0.5, help='填充密度（默认 0.5）')
+    gen_parser.add_argument('--count', type=int, default=10, help='题目数量')
+    gen_parser.add_argument('--unique', action='store_true', help='只保留唯一解的题目')
+    gen_parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    gen_parser.set_defaults(func=command_generate)
+
+    run_parser = subparsers.add_parser('run', help='运行基准测试')
+    run_parser.add_argument('--class', dest='classes', action='append',
+                            help='题目类别 WxH:密度:数量[:unique]，可重复；默认使用内置类别')
+    run_parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    run_parser.add_argument('--timeout', type=float, help='每个题目的求解时间上限（秒）')
+    run_parser.add_argument('--probe-workers', type=int,
+                            help='并行探测的进程数（默认单进程探测）')
+    run_parser.add_argument('-o', '--output', help='保存结果的JSON文件')
+    run_parser.add_argument('--label', default='', help='结果标签，例如求解器版本')
+    run_parser.set_defaults(func=command_run)
+
+    cmp_parser = subparsers.add_parser('compare', help='对比两次基准测试结果')
+    cmp_parser.add_argument('old', help='旧结果JSON')
+    cmp_parser.add_argument('new', help='新结果JSON')
+    cmp_parser.set_defaults(func=command_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
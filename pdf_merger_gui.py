@@ -1,24 +1,45 @@
 import sys
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QComboBox, 
-                             QFileDialog, QProgressBar, QMessageBox, QSpinBox)
+                             QFileDialog, QProgressBar, QMessageBox, QSpinBox,
+                             QCheckBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont
-import fitz  # PyMuPDF
-from PIL import Image
 import os
 
+from pdf_merger_tools import (merge_pdf_pages, merge_pdf_vector, format_timings, RenderCache,
+                              DEFAULT_QUALITY, DEFAULT_COMPRESS_LEVEL)
+
+# 输出方式选项：(显示名称, 格式)，格式 'vector' 表示矢量n合1 PDF
+OUTPUT_CHOICES = [
+    ('PNG图片', 'png'),
+    ('JPEG图片', 'jpeg'),
+    ('WebP图片', 'webp'),
+    ('多页TIFF', 'tiff'),
+    ('PDF（栅格化）', 'pdf'),
+    ('PDF（矢量，不栅格化）', 'vector'),
+]
+
 
 class PDFProcessThread(QThread):
     progress = pyqtSignal(int)
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
     
-    def __init__(self, pdf_path, layout, dpi, output_dir=None):
+    def __init__(self, pdf_path, layout, dpi, output_dir=None, workers=1, output_format='png',
+                 quality=DEFAULT_QUALITY, compress_level=DEFAULT_COMPRESS_LEVEL, direct=False,
+                 max_sheet_size=None, cache=None):
         super().__init__()
         self.pdf_path = pdf_path
         self.layout = layout
         self.dpi = dpi
+        self.workers = workers
+        self.output_format = output_format
+        self.quality = quality
+        self.compress_level = compress_level
+        self.direct = direct
+        self.max_sheet_size = max_sheet_size
+        self.cache = cache
         
         # 如果没有指定输出目录，使用PDF文件所在目录
         if output_dir:
@@ -26,74 +47,25 @@ class PDFProcessThread(QThread):
         else:
             self.output_dir = os.path.dirname(pdf_path)
         
-        # 获取PDF文件名（不含扩展名）
-        self.base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-        
     def run(self):
         try:
-            # 打开PDF
-            doc = fitz.open(self.pdf_path)
-            total_pages = len(doc)
-            
-            # 根据布局确定每张图片包含的页数
-            layout_map = {'2x2': 4, '3x2': 6, '3x3': 9}
-            pages_per_image = layout_map[self.layout]
-            
-            # 计算行列数
-            if self.layout == '2x2':
-                rows, cols = 2, 2
-            elif self.layout == '3x2':
-                rows, cols = 3, 2
-            else:  # 3x3
-                rows, cols = 3, 3
-            
-            # 渲染所有页面为图片
-            page_images = []
-            for i in range(total_pages):
-                page = doc[i]
-                mat = fitz.Matrix(self.dpi/72, self.dpi/72)
-                pix = page.get_pixmap(matrix=mat)
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                page_images.append(img)
-                self.progress.emit(int((i + 1) / total_pages * 50))
+            progress_callback = lambda done, total: self.progress.emit(int(done * 100 / total))
+            if self.output_format == 'vector':
+                base_name = os.path.splitext(os.path.basename(self.pdf_path))[0]
+                output_path = os.path.join(self.output_dir, f'{base_name}_merged.pdf')
+                merge_pdf_vector(self.pdf_path, self.layout, output_path, progress_callback)
+                self.finished.emit(f"成功生成PDF\n保存位置: {output_path}")
+                return
             
-            # 获取单页尺寸
-            if page_images:
-                page_width, page_height = page_images[0].size
-            else:
-                raise Exception("PDF没有页面")
-            
-            # 创建合并图片
-            output_count = 0
-            for start_idx in range(0, total_pages, pages_per_image):
-                # 创建画布
-                canvas_width = page_width * cols
-                canvas_height = page_height * rows
-                canvas = Image.new('RGB', (canvas_width, canvas_height), 'white')
-                
-                # 粘贴页面
-                for i in range(pages_per_image):
-                    page_idx = start_idx + i
-                    if page_idx >= total_pages:
-                        break
-                    
-                    row = i // cols
-                    col = i % cols
-                    x = col * page_width
-                    y = row * page_height
-                    
-                    canvas.paste(page_images[page_idx], (x, y))
-                
-                # 保存图片
-                output_count += 1
-                output_path = os.path.join(self.output_dir, f'{self.base_name}_merged_{output_count}.png')
-                canvas.save(output_path, 'PNG', quality=95)
-                
-                progress_val = 50 + int((start_idx + pages_per_image) / total_pages * 50)
-                self.progress.emit(min(progress_val, 100))
-            
-            doc.close()
-            self.finished.emit(f"成功生成 {output_count} 张图片\n保存位置: {self.output_dir}")
+            timings = {}
+            outputs = merge_pdf_pages(
+                self.pdf_path, self.layout, self.dpi, self.output_dir,
+                progress_callback=progress_callback, workers=self.workers,
+                output_format=self.output_format, quality=self.quality,
+                compress_level=self.compress_level, direct=self.direct, timings=timings,
+                max_sheet_size=self.max_sheet_size, cache=self.cache)
+            self.finished.emit(f"成功生成 {len(outputs)} 个文件\n保存位置: {self.output_dir}\n"
+                               f"耗时: {format_timings(timings)}")
             
         except Exception as e:
             self.error.emit(str(e))
@@ -108,7 +80,7 @@ class PDFMergerGUI(QMainWindow):
         
     def init_ui(self):
         self.setWindowTitle('PDF页面聚合工具')
-        self.setGeometry(100, 100, 600, 350)
+        self.setGeometry(100, 100, 600, 480)
         
         # 主widget
         central_widget = QWidget()
@@ -152,6 +124,36 @@ class PDFMergerGUI(QMainWindow):
         layout_h.addStretch()
         layout.addLayout(layout_h)
         
+        # 输出方式
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel('输出方式:'))
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems([name for name, _ in OUTPUT_CHOICES])
+        self.mode_combo.currentIndexChanged.connect(self.update_mode)
+        mode_layout.addWidget(self.mode_combo)
+        mode_layout.addStretch()
+        layout.addLayout(mode_layout)
+        
+        # 编码选项
+        encode_layout = QHBoxLayout()
+        encode_layout.addWidget(QLabel('质量:'))
+        self.quality_spin = QSpinBox()
+        self.quality_spin.setRange(1, 100)
+        self.quality_spin.setValue(DEFAULT_QUALITY)
+        encode_layout.addWidget(self.quality_spin)
+        encode_layout.addWidget(QLabel('PNG压缩级别:'))
+        self.compress_spin = QSpinBox()
+        self.compress_spin.setRange(0, 9)
+        self.compress_spin.setValue(DEFAULT_COMPRESS_LEVEL)
+        self.compress_spin.setToolTip('0-9，越小编码越快、文件越大')
+        encode_layout.addWidget(self.compress_spin)
+        self.direct_check = QCheckBox('直接拼合像素')
+        self.direct_check.setChecked(True)
+        self.direct_check.setToolTip('页面像素直接复制到预分配的画布，省去中间图片副本')
+        encode_layout.addWidget(self.direct_check)
+        encode_layout.addStretch()
+        layout.addLayout(encode_layout)
+        
         # DPI设置
         dpi_layout = QHBoxLayout()
         dpi_layout.addWidget(QLabel('图片DPI:'))
@@ -160,9 +162,32 @@ class PDFMergerGUI(QMainWindow):
         self.dpi_spin.setValue(150)
         self.dpi_spin.setSuffix(' dpi')
         dpi_layout.addWidget(self.dpi_spin)
+        dpi_layout.addWidget(QLabel('最大边长:'))
+        self.max_size_spin = QSpinBox()
+        self.max_size_spin.setRange(0, 20000)
+        self.max_size_spin.setSingleStep(500)
+        self.max_size_spin.setSpecialValueText('不限')
+        self.max_size_spin.setSuffix(' px')
+        self.max_size_spin.setToolTip('合并图最长边超过时按更低的倍率直接渲染页面')
+        dpi_layout.addWidget(self.max_size_spin)
         dpi_layout.addStretch()
         layout.addLayout(dpi_layout)
         
+        # 渲染进程数
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel('渲染进程数:'))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, os.cpu_count() or 1)
+        self.workers_spin.setValue(os.cpu_count() or 1)
+        workers_layout.addWidget(self.workers_spin)
+        self.cache_check = QCheckBox('缓存页面渲染结果')
+        self.cache_check.setChecked(False)
+        self.cache_check.setToolTip('同一个PDF换布局再合并时不用重新渲染页面；'
+                                    '每页按未压缩的像素保存，高DPI时占用磁盘较多')
+        workers_layout.addWidget(self.cache_check)
+        workers_layout.addStretch()
+        layout.addLayout(workers_layout)
+        
         # 进度条
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -198,6 +223,7 @@ class PDFMergerGUI(QMainWindow):
         layout.addWidget(self.status_label)
         
         layout.addStretch()
+        self.update_mode()
         
     def select_pdf(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -223,6 +249,18 @@ class PDFMergerGUI(QMainWindow):
             self.output_label.setStyleSheet('padding: 8px; background: #fff3e0; border-radius: 4px;')
             self.check_ready()
             
+    def update_mode(self):
+        # 矢量输出不需要DPI、渲染进程和编码选项
+        output_format = OUTPUT_CHOICES[self.mode_combo.currentIndex()][1]
+        raster = output_format != 'vector'
+        self.dpi_spin.setEnabled(raster)
+        self.max_size_spin.setEnabled(raster)
+        self.workers_spin.setEnabled(raster)
+        self.cache_check.setEnabled(raster)
+        self.direct_check.setEnabled(raster)
+        self.quality_spin.setEnabled(output_format in ('jpeg', 'webp', 'pdf'))
+        self.compress_spin.setEnabled(output_format == 'png')
+        
     def check_ready(self):
         # 只要选择了PDF文件就可以转换
         if self.pdf_path:
@@ -236,6 +274,8 @@ class PDFMergerGUI(QMainWindow):
         
         # 获取DPI
         dpi = self.dpi_spin.value()
+        workers = self.workers_spin.value()
+        output_format = OUTPUT_CHOICES[self.mode_combo.currentIndex()][1]
         
         # 禁用按钮，显示进度条
         self.convert_btn.setEnabled(False)
@@ -244,7 +284,12 @@ class PDFMergerGUI(QMainWindow):
         self.status_label.setText('处理中...')
         
         # 创建处理线程（如果output_dir为None，线程会自动使用PDF所在目录）
-        self.thread = PDFProcessThread(self.pdf_path, layout, dpi, self.output_dir)
+        self.thread = PDFProcessThread(self.pdf_path, layout, dpi, self.output_dir, workers,
+                                       output_format, self.quality_spin.value(),
+                                       self.compress_spin.value(),
+                                       self.direct_check.isChecked(),
+                                       self.max_size_spin.value() or None,
+                                       RenderCache() if self.cache_check.isChecked() else None)
         self.thread.progress.connect(self.update_progress)
         self.thread.finished.connect(self.conversion_finished)
         self.thread.error.connect(self.conversion_error)
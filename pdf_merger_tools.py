@@ -0,0 +1,656 @@
+"""
+PDF页面聚合：把多页排成 2x2 / 3x2 / 3x3 拼成一张图片（不依赖Qt，可作为库或命令行使用）
+
+用法示例：
+    python pdf_merger_tools.py book.pdf --layout 3x2 --dpi 150
+    python pdf_merger_tools.py book.pdf --format jpeg --quality 85 --direct -j 4
+    python pdf_merger_tools.py book.pdf --format png --compress-level 1
+    python pdf_merger_tools.py scan.pdf --format tiff -o out/
+    python pdf_merger_tools.py mixed.pdf --dpi 300 --max-size 4000 --format jpeg
+    python pdf_merger_tools.py book.pdf --layout 3x3 --cache
+    python pdf_merger_tools.py book.pdf --vector
+
+逐张合并图流水线处理：只渲染当前这张图需要的页面，每页渲染后立即贴到画布上并释放，
+保存后再处理下一张。内存峰值只有一张画布加一页，与文档页数无关。
+
+workers 大于1时用进程池渲染：每个工作进程打开自己的文档，渲染连续的若干张合并图并
+编码为PNG字节，主进程按顺序写出文件。同时在途的块数有上限，内存占用仍然有界。
+
+输出格式：png（compress_level 0-9）、jpeg / webp（quality），以及把所有合并图写进
+一个文件的多页 tiff（deflate压缩）和 pdf（每页嵌入一张JPEG，逐页直接写进文件）。
+direct 为True时页面像素直接复制到预先分配的 fitz.Pixmap 画布上，编码时PIL只引用画布的内存，
+不再经过 Pixmap -> bytes -> Image.frombytes 的中间副本。
+各阶段（渲染、拼合、编码、写出）的耗时累计到 timings 字典中。
+
+页面大小可以不同：每张合并图的格子取这张图中各页宽、高的最大值，页面居中放入格子。
+给出 max_sheet_size（合并图最长边的像素数）时直接用更小的倍率渲染，而不是
+按dpi渲染后再缩小。
+
+给出 RenderCache 时页面渲染结果按 (文档哈希, 页码, 渲染倍率) 保存在磁盘上，
+同一个PDF换布局再合并时直接读取，只重做拼合和编码；缓存按总大小做LRU淘汰。
+
+merge_pdf_vector 不做栅格化，把原页面作为矢量内容放到新PDF的大页面上，
+速度快得多，文字保持清晰，文件也小。
+"""
+
+import os
+import io
+import sys
+import math
+import time
+import hashlib
+from collections import deque
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+# 布局名称 -> (行数, 列数)
+LAYOUTS = {'2x2': (2, 2), '3x2': (3, 2), '3x3': (3, 3)}
+
+# 输出格式 -> (扩展名, 是否所有合并图写进一个文件)
+OUTPUT_FORMATS = {
+    'png': ('.png', False),
+    'jpeg': ('.jpg', False),
+    'webp': ('.webp', False),
+    'tiff': ('.tif', True),
+    'pdf': ('.pdf', True),
+}
+DEFAULT_QUALITY = 90
+DEFAULT_COMPRESS_LEVEL = 6
+
+# 计时的阶段
+TIMING_STAGES = ('render', 'composite', 'encode', 'write')
+
+# 进程池模式下每块最多包含的合并图数量，以及每个进程最多在途的块数
+MAX_SHEETS_PER_BLOCK = 4
+BLOCKS_IN_FLIGHT_PER_WORKER = 2
+
+# 渲染缓存默认的大小上限（字节）
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024
+
+
+def render_page(page, matrix):
+    """把一页渲染为RGB的PIL图片"""
+    pix = page.get_pixmap(matrix=matrix)
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+
+def tile_origin(i, cols, tile_size, pix_size):
+    """第i页在合并图中的左上角坐标：行优先排列，在格子中居中"""
+    tile_width, tile_height = tile_size
+    x = (i % cols) * tile_width + max(0, (tile_width - pix_size[0]) // 2)
+    y = (i // cols) * tile_height + max(0, (tile_height - pix_size[1]) // 2)
+    return x, y
+
+
+def default_cache_dir():
+    """渲染缓存的默认目录：%LOCALAPPDATA% 或 $XDG_CACHE_HOME，都没有时为 ~/.cache"""
+    base = (os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'pdf_merger', 'renders')
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 每个进程中各缓存目录自上次淘汰之后写入的字节数
+_cache_written = {}
+
+
+class RenderCache:
+    """页面渲染结果的磁盘缓存，按总字节数做LRU淘汰
+
+    键为 (文档内容的SHA-256, 页码, 渲染倍率)，每页一个未压缩的PAM文件，读取基本上
+    只是一次文件拷贝。命中时更新文件的修改时间，prune() 按修改时间从旧到新删除，
+    直到总大小不超过 max_bytes。每个进程自上次淘汰后写入超过 max_bytes 的 1/8
+    就淘汰一次，合并过程中每个渲染进程最多让目录超出上限 1/8。
+    写入先写临时文件再改名，多个渲染进程可以共用一个目录。
+    对象可以pickle，随任务一起发给工作进程；写入量记在模块级的 _cache_written 中，
+    不随对象pickle，否则每个块都会从0开始计数，永远不会触发淘汰。
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_SIZE):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, doc_hash, page_idx, scale):
+        return os.path.join(self.directory, f'{doc_hash}_{page_idx}_{scale:.6f}.pam')
+
+    def get_pixmap(self, doc, doc_hash, page_idx, scale):
+        """页面按 scale 倍渲染的 Pixmap；缓存中没有时渲染并写入缓存"""
+        path = self.path(doc_hash, page_idx, scale)
+        if os.path.exists(path):
+            try:
+                pix = fitz.Pixmap(path)
+                os.utime(path)
+            except Exception:
+                # 文件不完整或刚被其他进程淘汰，当作未命中重新渲染
+                pass
+            else:
+                self.hits += 1
+                return pix
+
+        self.misses += 1
+        pix = doc[page_idx].get_pixmap(matrix=fitz.Matrix(scale, scale))
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            pix.save(temp_path, output='pam')
+            written = _cache_written.get(self.directory, 0) + os.path.getsize(temp_path)
+            _cache_written[self.directory] = written
+            os.replace(temp_path, path)
+            if written > self.max_bytes // 8:
+                self.prune()
+        except Exception:
+            # 写不进缓存（磁盘满、目录只读等）不影响合并
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return pix
+
+    def prune(self):
+        """删除最久未使用的缓存文件直到总大小不超过 max_bytes，返回删除的文件数"""
+        _cache_written[self.directory] = 0
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.name.endswith('.pam') and entry.is_file()]
+        except FileNotFoundError:
+            return 0
+        files = []
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime_ns, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+def estimate_cache_bytes(sizes, sheets):
+    """按 plan_sheets 的结果渲染全部页面时，缓存文件的大致总字节数"""
+    total = 0
+    for pages, scale, _ in sheets:
+        for page_idx in pages:
+            width, height = sizes[page_idx]
+            total += math.ceil(width * scale) * math.ceil(height * scale) * 3
+    return total
+
+
+def page_pixmap(doc, page_idx, scale, cache=None, doc_hash=None):
+    """按 scale 倍渲染一页；给出 cache 时先查渲染缓存"""
+    if cache is None:
+        return doc[page_idx].get_pixmap(matrix=fitz.Matrix(scale, scale))
+    return cache.get_pixmap(doc, doc_hash, page_idx, scale)
+
+
+def render_sheet(doc, page_indices, rows, cols, scale, tile_size, timings=None,
+                 cache=None, doc_hash=None):
+    """渲染一张合并图（PIL画布），页面按 scale 倍渲染，每个格子大小为 tile_size"""
+    tile_width, tile_height = tile_size
+    canvas = Image.new('RGB', (tile_width * cols, tile_height * rows), 'white')
+    render = composite = 0.0
+    for i, page_idx in enumerate(page_indices):
+        start = time.perf_counter()
+        pix = page_pixmap(doc, page_idx, scale, cache, doc_hash)
+        rendered = time.perf_counter()
+        image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        canvas.paste(image, tile_origin(i, cols, tile_size, image.size))
+        image.close()
+        render += rendered - start
+        composite += time.perf_counter() - rendered
+    if timings is not None:
+        timings['render'] += render
+        timings['composite'] += composite
+    return canvas
+
+
+def render_sheet_pixmap(doc, page_indices, rows, cols, scale, tile_size, timings=None,
+                        cache=None, doc_hash=None):
+    """渲染一张合并图，页面像素直接复制到预先分配的 fitz.Pixmap 画布上"""
+    tile_width, tile_height = tile_size
+    canvas = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, tile_width * cols, tile_height * rows),
+                         False)
+    canvas.clear_with(255)
+    render = composite = 0.0
+    for i, page_idx in enumerate(page_indices):
+        start = time.perf_counter()
+        pix = page_pixmap(doc, page_idx, scale, cache, doc_hash)
+        rendered = time.perf_counter()
+        pix.set_origin(*tile_origin(i, cols, tile_size, (pix.width, pix.height)))
+        canvas.copy(pix, pix.irect)
+        render += rendered - start
+        composite += time.perf_counter() - rendered
+    if timings is not None:
+        timings['render'] += render
+        timings['composite'] += composite
+    return canvas
+
+
+def pixmap_image(pix):
+    """引用 Pixmap 内存的PIL图片（不复制像素），使用期间 pix 必须保持存活"""
+    return Image.frombuffer('RGB', (pix.width, pix.height), pix.samples_mv, 'raw', 'RGB', 0, 1)
+
+
+def encode_sheet(image, output_format, quality=DEFAULT_QUALITY,
+                 compress_level=DEFAULT_COMPRESS_LEVEL):
+    """把合并图编码为字节；多页格式编码为其中的一页（tiff为单页TIFF，pdf为JPEG）"""
+    buffer = io.BytesIO()
+    if output_format == 'png':
+        image.save(buffer, 'PNG', compress_level=compress_level)
+    elif output_format in ('jpeg', 'pdf'):
+        image.save(buffer, 'JPEG', quality=quality)
+    elif output_format == 'webp':
+        image.save(buffer, 'WEBP', quality=quality)
+    elif output_format == 'tiff':
+        image.save(buffer, 'TIFF', compression='tiff_adobe_deflate')
+    else:
+        raise ValueError(f'不支持的输出格式: {output_format}')
+    return buffer.getvalue()
+
+
+def sheet_page_ranges(total_pages, pages_per_sheet):
+    """每张合并图包含的页码范围"""
+    return [range(start, min(start + pages_per_sheet, total_pages))
+            for start in range(0, total_pages, pages_per_sheet)]
+
+
+def page_sizes(doc):
+    """每页的尺寸（点，已考虑页面旋转）"""
+    return [(page.rect.width, page.rect.height) for page in doc]
+
+
+def sheet_tile_box(sizes, pages):
+    """一张合并图的格子大小（点）：这张图中各页宽、高的最大值"""
+    return max(sizes[i][0] for i in pages), max(sizes[i][1] for i in pages)
+
+
+def plan_sheets(sizes, rows, cols, dpi, max_sheet_size=None):
+    """规划每张合并图，返回 [(页码范围, 渲染倍率, 格子像素大小), ...]
+
+    渲染倍率为 dpi/72；合并图最长边会超过 max_sheet_size 像素时改用更小的倍率。
+    """
+    plans = []
+    for pages in sheet_page_ranges(len(sizes), rows * cols):
+        width, height = sheet_tile_box(sizes, pages)
+        scale = dpi / 72
+        if max_sheet_size:
+            scale = min(scale, max_sheet_size / max(width * cols, height * rows))
+        tile = (fitz.Rect(0, 0, width, height) * fitz.Matrix(scale, scale)).irect
+        plans.append((pages, scale, (tile.width, tile.height)))
+    return plans
+
+
+def new_timings():
+    return dict.fromkeys(TIMING_STAGES, 0.0)
+
+
+# 每个进程中已打开的文档，同一进程渲染多张合并图时只打开一次
+_docs = {}
+
+
+def _get_doc(pdf_path):
+    st = os.stat(pdf_path)
+    # fork出的工作进程会继承父进程打开的文档，共用文件偏移会读坏数据，必须自己重新打开
+    key = (os.getpid(), os.path.abspath(pdf_path), st.st_size, st.st_mtime_ns)
+    doc = _docs.get(key)
+    if doc is None:
+        close_cached_docs()
+        doc = _docs[key] = fitz.open(pdf_path)
+    return doc
+
+
+def close_cached_docs():
+    for doc in _docs.values():
+        doc.close()
+    _docs.clear()
+
+
+def render_sheet_bytes(task):
+    """渲染并编码一张合并图，返回 (编码后的字节, 各阶段耗时)
+
+    task 为 (pdf_path, 起始页, 结束页, 行数, 列数, 渲染倍率, 格子大小, 输出选项)，
+    输出选项为 (格式, quality, compress_level, direct, 渲染缓存, 文档哈希)。
+    使用缓存时耗时中另有 cache_hits / cache_misses（页数）。
+    """
+    pdf_path, start, stop, rows, cols, scale, tile_size, options = task
+    output_format, quality, compress_level, direct, cache, doc_hash = options
+    timings = new_timings()
+    if cache is not None:
+        hits, misses = cache.hits, cache.misses
+    doc = _get_doc(pdf_path)
+    if direct:
+        canvas = render_sheet_pixmap(doc, range(start, stop), rows, cols, scale, tile_size,
+                                     timings, cache, doc_hash)
+        image = pixmap_image(canvas)
+    else:
+        image = render_sheet(doc, range(start, stop), rows, cols, scale, tile_size, timings,
+                             cache, doc_hash)
+    if cache is not None:
+        timings['cache_hits'] = cache.hits - hits
+        timings['cache_misses'] = cache.misses - misses
+    encode_start = time.perf_counter()
+    data = encode_sheet(image, output_format, quality, compress_level)
+    timings['encode'] += time.perf_counter() - encode_start
+    image.close()
+    return data, timings
+
+
+def _render_block(tasks):
+    return [render_sheet_bytes(task) for task in tasks]
+
+
+def iter_rendered(tasks, workers=1):
+    """按任务顺序逐个产出 render_sheet_bytes 的结果
+
+    workers 大于1时把连续的合并图分块交给进程池，按块的顺序取回结果，
+    在途的块数不超过 workers * BLOCKS_IN_FLIGHT_PER_WORKER。
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        try:
+            for task in tasks:
+                yield render_sheet_bytes(task)
+        finally:
+            # 不在GUI进程里一直占用PDF文件
+            close_cached_docs()
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers, len(tasks))
+    block_size = max(1, min(MAX_SHEETS_PER_BLOCK,
+                            math.ceil(len(tasks) / (workers * BLOCKS_IN_FLIGHT_PER_WORKER))))
+    blocks = iter([tasks[i:i + block_size] for i in range(0, len(tasks), block_size)])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for block in blocks:
+            pending.append(executor.submit(_render_block, block))
+            if len(pending) >= workers * BLOCKS_IN_FLIGHT_PER_WORKER:
+                break
+        while pending:
+            results = pending.popleft().result()
+            block = next(blocks, None)
+            if block is not None:
+                pending.append(executor.submit(_render_block, block))
+            yield from results
+
+
+class _TiffSheetWriter:
+    """把单页TIFF逐张追加到一个多页TIFF文件"""
+
+    def __init__(self, path):
+        from PIL import TiffImagePlugin
+
+        self.writer = TiffImagePlugin.AppendingTiffWriter(path, True)
+
+    def add(self, data, size, scale):
+        self.writer.write(data)
+        self.writer.newFrame()
+
+    def close(self):
+        self.writer.close()
+
+
+class _PdfSheetWriter:
+    """把JPEG编码的合并图逐页直接写进PDF文件，页面尺寸按渲染倍率换算回点
+
+    每张图写出后不再留在内存里，只记下各对象的文件偏移；页面树和交叉引用表
+    在 close() 时追加到文件末尾。所以内存占用与页数无关，
+    也不需要像增量保存那样每页重写一遍页面树。
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self.offsets = {}
+        self.page_ids = []
+        # 对象1是目录、对象2是页面树，都在 close() 中写出
+        self.next_id = 3
+
+    def _write_object(self, obj_id, header, stream=None):
+        self.offsets[obj_id] = self.file.tell()
+        self.file.write(b'%d 0 obj\n' % obj_id + header)
+        if stream is not None:
+            self.file.write(b'\nstream\n')
+            self.file.write(stream)
+            self.file.write(b'\nendstream')
+        self.file.write(b'\nendobj\n')
+
+    def add(self, data, size, scale):
+        width, height = size
+        page_width, page_height = width / scale, height / scale
+        image_id, content_id, page_id = self.next_id, self.next_id + 1, self.next_id + 2
+        self.next_id += 3
+        self._write_object(
+            image_id,
+            b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB '
+            b'/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>' % (width, height, len(data)),
+            data)
+        content = b'q %.4f 0 0 %.4f 0 0 cm /Im0 Do Q' % (page_width, page_height)
+        self._write_object(content_id, b'<< /Length %d >>' % len(content), content)
+        self._write_object(
+            page_id,
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.4f %.4f] '
+            b'/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>'
+            % (page_width, page_height, image_id, content_id))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        self._write_object(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids)))
+        self._write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        xref_offset = self.file.tell()
+        self.file.write(b'xref\n0 %d\n0000000000 65535 f \n' % self.next_id)
+        for obj_id in range(1, self.next_id):
+            self.file.write(b'%010d 00000 n \n' % self.offsets[obj_id])
+        self.file.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                        % (self.next_id, xref_offset))
+        self.file.close()
+
+
+def merge_pdf_pages(pdf_path, layout, dpi, output_dir=None, progress_callback=None,
+                    workers=1, output_format='png', quality=DEFAULT_QUALITY,
+                    compress_level=DEFAULT_COMPRESS_LEVEL, direct=False, timings=None,
+                    max_sheet_size=None, cache=None):
+    """把PDF按布局拼成图片，返回输出文件路径列表
+
+    max_sheet_size 为合并图最长边的像素上限（见 plan_sheets）。
+    cache 为 RenderCache 时复用之前渲染过的页面，并按大小上限淘汰旧文件；
+    这个文档全部页面的渲染结果就超过缓存上限时不使用缓存（timings 中 cache_skipped 为True），
+    否则缓存只会边写边淘汰，白白写盘。
+    progress_callback(已处理页数, 总页数) 在每张图写出后调用；
+    workers 为渲染进程数，1 表示在当前进程中渲染。tiff / pdf 格式只输出一个文件。
+    给出 timings 字典时累加各阶段耗时（秒）；多进程时渲染、拼合、编码为各进程之和，
+    另有 'total' 为总的实际耗时，使用缓存时还有 cache_hits / cache_misses。
+    """
+    total_start = time.perf_counter()
+    if not output_dir:
+        output_dir = os.path.dirname(pdf_path)
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    rows, cols = LAYOUTS[layout]
+    extension, multipage = OUTPUT_FORMATS[output_format]
+
+    with fitz.open(pdf_path) as doc:
+        total_pages = len(doc)
+        if total_pages == 0:
+            raise Exception("PDF没有页面")
+        sizes = page_sizes(doc)
+
+    # 格子大小由页面尺寸算出，不需要先渲染
+    sheets = plan_sheets(sizes, rows, cols, dpi, max_sheet_size)
+    if timings is None:
+        timings = {}
+    if cache is not None and estimate_cache_bytes(sizes, sheets) > cache.max_bytes:
+        cache = None
+        timings['cache_skipped'] = True
+    doc_hash = file_sha256(pdf_path) if cache is not None else None
+    options = (output_format, quality, compress_level, direct, cache, doc_hash)
+    tasks = [(pdf_path, pages.start, pages.stop, rows, cols, scale, tile_size, options)
+             for pages, scale, tile_size in sheets]
+
+    for stage in TIMING_STAGES:
+        timings.setdefault(stage, 0.0)
+
+    outputs = []
+    sink = None
+    if multipage:
+        output_path = os.path.join(output_dir, f'{base_name}_merged{extension}')
+        if output_format == 'tiff':
+            sink = _TiffSheetWriter(output_path)
+        else:
+            sink = _PdfSheetWriter(output_path)
+        outputs.append(output_path)
+    try:
+        for sheet_index, (data, sheet_timings) in enumerate(iter_rendered(tasks, workers), 1):
+            for stage, seconds in sheet_timings.items():
+                timings[stage] = timings.get(stage, 0) + seconds
+            pages, scale, (tile_width, tile_height) = sheets[sheet_index - 1]
+            write_start = time.perf_counter()
+            if sink is not None:
+                sink.add(data, (tile_width * cols, tile_height * rows), scale)
+            else:
+                output_path = os.path.join(output_dir,
+                                           f'{base_name}_merged_{sheet_index}{extension}')
+                with open(output_path, 'wb') as f:
+                    f.write(data)
+                outputs.append(output_path)
+            timings['write'] += time.perf_counter() - write_start
+            if progress_callback:
+                progress_callback(pages.stop, total_pages)
+    finally:
+        if sink is not None:
+            write_start = time.perf_counter()
+            sink.close()
+            timings['write'] += time.perf_counter() - write_start
+        if cache is not None:
+            cache.prune()
+    timings['total'] = timings.get('total', 0.0) + time.perf_counter() - total_start
+    return outputs
+
+
+def format_timings(timings):
+    """把各阶段耗时格式化为一行文字"""
+    names = {'render': '渲染', 'composite': '拼合', 'encode': '编码', 'write': '写出',
+             'total': '总计'}
+    text = '，'.join(f'{names[stage]} {timings[stage]:.2f}s'
+                     for stage in TIMING_STAGES + ('total',) if stage in timings)
+    if 'cache_hits' in timings:
+        pages = timings['cache_hits'] + timings['cache_misses']
+        text += f"，缓存命中 {timings['cache_hits']}/{pages} 页"
+    elif timings.get('cache_skipped'):
+        text += '，文档超过缓存上限，未使用缓存'
+    return text
+
+
+def merge_pdf_vector(pdf_path, layout, output_path=None, progress_callback=None):
+    """把PDF按布局拼成一个新的PDF（矢量，不栅格化），返回输出文件路径
+
+    每张合并页的格子大小取这张中各页宽、高的最大值，页面保持原尺寸居中放入格子。
+    """
+    rows, cols = LAYOUTS[layout]
+    if not output_path:
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        output_path = os.path.join(os.path.dirname(pdf_path), f'{base_name}_merged.pdf')
+
+    with fitz.open(pdf_path) as src, fitz.open() as out:
+        total_pages = len(src)
+        if total_pages == 0:
+            raise Exception("PDF没有页面")
+        sizes = page_sizes(src)
+
+        for pages in sheet_page_ranges(total_pages, rows * cols):
+            tile_width, tile_height = sheet_tile_box(sizes, pages)
+            sheet = out.new_page(width=tile_width * cols, height=tile_height * rows)
+            for i, page_idx in enumerate(pages):
+                width, height = sizes[page_idx]
+                x = (i % cols) * tile_width + (tile_width - width) / 2
+                y = (i // cols) * tile_height + (tile_height - height) / 2
+                # show_pdf_page 对带 /Rotate 的源页面会算错缩放，先在内存中清掉旋转再显式转回来
+                rotation = src[page_idx].rotation
+                if rotation:
+                    src[page_idx].set_rotation(0)
+                sheet.show_pdf_page(fitz.Rect(x, y, x + width, y + height), src, page_idx,
+                                    rotate=-rotation)
+            if progress_callback:
+                progress_callback(pages.stop, total_pages)
+
+        # 同一源文档的字体、图像在输出中只保存一份
+        out.save(output_path, garbage=3, deflate=True)
+    return output_path
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='把PDF的多页拼成一张图片或一个n合1的PDF')
+    parser.add_argument('input', help='PDF文件')
+    parser.add_argument('-o', '--output-dir', help='输出目录（默认为PDF所在目录）')
+    parser.add_argument('--layout', choices=sorted(LAYOUTS), default='2x2',
+                        help='页面布局（默认 2x2）')
+    parser.add_argument('--dpi', type=int, default=150, help='渲染DPI（默认 150）')
+    parser.add_argument('--format', dest='output_format', choices=sorted(OUTPUT_FORMATS),
+                        default='png', help='输出格式（默认 png）')
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY,
+                        help=f'jpeg/webp/pdf 的质量（默认 {DEFAULT_QUALITY}）')
+    parser.add_argument('--compress-level', type=int, default=DEFAULT_COMPRESS_LEVEL,
+                        choices=range(10), metavar='0-9',
+                        help=f'png 压缩级别，越小越快（默认 {DEFAULT_COMPRESS_LEVEL}）')
+    parser.add_argument('--direct', action='store_true',
+                        help='直接把页面像素复制到预分配的画布，省去PIL中间副本')
+    parser.add_argument('--max-size', type=int,
+                        help='合并图最长边的像素上限，超过时按更低的倍率直接渲染')
+    parser.add_argument('-j', '--workers', type=int, default=1, help='渲染进程数（默认 1）')
+    parser.add_argument('--cache', action='store_true',
+                        help='缓存页面渲染结果，同一PDF换布局再合并时只重做拼合')
+    parser.add_argument('--cache-dir', help=f'渲染缓存目录（默认 {default_cache_dir()}）')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE >> 20,
+                        help=f'渲染缓存的大小上限，MB（默认 {DEFAULT_CACHE_SIZE >> 20}）')
+    parser.add_argument('--vector', action='store_true',
+                        help='输出矢量n合1 PDF，不栅格化（忽略dpi和格式选项）')
+    args = parser.parse_args(argv)
+
+    def progress(done, total):
+        print(f'\r已处理 {done}/{total} 页', end='', file=sys.stderr)
+
+    if args.vector:
+        output_path = None
+        if args.output_dir:
+            base_name = os.path.splitext(os.path.basename(args.input))[0]
+            output_path = os.path.join(args.output_dir, f'{base_name}_merged.pdf')
+        output_path = merge_pdf_vector(args.input, args.layout, output_path, progress)
+        print(file=sys.stderr)
+        print(output_path)
+        return 0
+
+    cache = None
+    if args.cache or args.cache_dir:
+        cache = RenderCache(args.cache_dir, args.cache_size << 20)
+    timings = {}
+    outputs = merge_pdf_pages(args.input, args.layout, args.dpi, args.output_dir, progress,
+                              args.workers, args.output_format, args.quality,
+                              args.compress_level, args.direct, timings, args.max_size, cache)
+    print(file=sys.stderr)
+    for output in outputs:
+        print(output)
+    print(format_timings(timings), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,772 @@
+"""
+PDF分割（不依赖Qt，可作为库或命令行使用）
+
+用法示例：
+    python pdf_split_tools.py book.pdf "1-5,6,7-9"
+    python pdf_split_tools.py scan.pdf "1-100,101-200,201-300" -o parts/ -j 4
+    python pdf_split_tools.py scan.pdf "every 10" -o parts/
+    python pdf_split_tools.py book.pdf "1-2,bookmarks" -o chapters/
+    python pdf_split_tools.py book.pdf "odd,even,10-"
+    python pdf_split_tools.py scan.pdf "every 20" -O --prune-resources --report-savings
+    python pdf_split_tools.py inbox/ "1,2-10,11-" -o out/ --check hash
+    python pdf_split_tools.py "scans/**/*.pdf" "every 50" -O -j 8
+
+各部分在多个进程中并行写出，每个工作进程打开自己的 PdfReader。
+输入为多个文件、目录或通配符时进入批量模式：每个PDF在一个工作进程中分割，
+并在输出目录写入 <文件名>.manifest.json 记录生成的部分。清单中列出的部分文件
+不会再被当作输入，所以不加 -o 时反复分割同一个目录也是安全的；加 -o 时各输入
+相对于共同上级目录的子目录结构保留在输出目录中。源文件和规则都没有
+变化的PDF会被跳过（--check mtime 比较大小和修改时间，--check hash 在修改时间
+变化时再比较SHA-256）。
+加 -O 时对每个部分去重相同对象、压缩未压缩的流并删除孤立对象；
+--prune-resources 还会删除页面资源中未使用的字体和图像，
+--report-savings 额外写一遍未优化的输出来统计节省的字节数。
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import hashlib
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject,
+                            NullObject, StreamObject)
+
+
+RULE_HELP = (
+    '• 单页: 6\n'
+    '• 页码范围: 1-5；开放范围: 10-（到最后一页）、-5（从第一页）\n'
+    '• 步长: 1-20/2（第1、3、…、19页合为一个文件）\n'
+    '• 奇偶页: odd、even\n'
+    '• 每N页一个文件: every 10，或只在范围内: 5-100 every 10\n'
+    '• 按书签分割: bookmarks（顶层书签），bookmarks 2（前两层书签）\n'
+    '• 多个规则用逗号分隔，每个规则生成一个或多个文件'
+)
+
+_RANGE_RE = re.compile(r'^(\d*)(?:(-)(\d*))?(?:/(\d+))?$')
+_EVERY_RE = re.compile(r'^(?:(\d*-\d*|\d+)\s+)?every\s*(\d+)$')
+_BOOKMARKS_RE = re.compile(r'^bookmarks(?:\s*(\d+))?$')
+
+
+def _parse_range(text):
+    """解析 A、A-B、A-、-B 以及可选的 /步长，返回 (起始页, 结束页或None, 步长)"""
+    match = _RANGE_RE.match(text)
+    if not match or not (match.group(1) or match.group(3)):
+        raise ValueError(f'无法识别的规则: {text}')
+    first, dash, last, step = match.groups()
+    start = int(first) if first else 1
+    if not dash:
+        end = start
+    else:
+        end = int(last) if last else None
+    step = int(step) if step else 1
+    if step < 1:
+        raise ValueError(f'步长必须大于0: {text}')
+    return start, end, step
+
+
+def parse_split_rules(rule_string):
+    """解析分页规则字符串（语法见 RULE_HELP），返回规则列表
+
+    每条规则是一个元组：
+        ('range', 起始页, 结束页或None, 步长, 名称)  一个文件
+        ('every', 每份页数, 起始页, 结束页或None)    每N页一个文件
+        ('bookmarks', 书签层数)                      每个书签一个文件
+    页码从1开始，结束页为None表示到最后一页。
+    """
+    rules = []
+    for item in rule_string.split(','):
+        item = ' '.join(item.lower().split())
+        if not item:
+            continue
+        if item in ('odd', 'even'):
+            rules.append(('range', 1 if item == 'odd' else 2, None, 2, item))
+            continue
+        match = _EVERY_RE.match(item)
+        if match:
+            size = int(match.group(2))
+            if size < 1:
+                raise ValueError(f'每份页数必须大于0: {item}')
+            start, end = 1, None
+            if match.group(1):
+                start, end, _ = _parse_range(match.group(1))
+            rules.append(('every', size, start, end))
+            continue
+        match = _BOOKMARKS_RE.match(item)
+        if match:
+            rules.append(('bookmarks', int(match.group(1) or 1)))
+            continue
+        start, end, step = _parse_range(item.replace(' ', ''))
+        rules.append(('range', start, end, step, None))
+    if not rules:
+        raise ValueError('没有分页规则')
+    return rules
+
+
+def read_bookmarks(reader, depth=1):
+    """返回前 depth 层书签的 [(起始页索引, 标题), ...]，按页码排序"""
+    found = []
+
+    def walk(items, level):
+        for item in items:
+            if isinstance(item, list):
+                if level < depth:
+                    walk(item, level + 1)
+                continue
+            try:
+                page_index = reader.get_destination_page_number(item)
+            except Exception:
+                continue
+            if page_index is not None and page_index >= 0:
+                found.append((page_index, str(item.title)))
+
+    walk(reader.outline, 1)
+    found.sort(key=lambda bookmark: bookmark[0])
+    return found
+
+
+def _safe_name(title, limit=60):
+    name = re.sub(r'[\\/:*?"<>|\s]+', '_', title).strip('._')
+    return name[:limit] or 'untitled'
+
+
+def expand_rules(rules, total_pages, bookmarks=None):
+    """把规则展开为输出部分，返回 (部分列表, 被跳过的规则说明)
+
+    每个部分为 (页索引列表, 文件名后缀)，页索引从0开始。
+    """
+    outputs = []
+    skipped = []
+    for rule in rules:
+        kind = rule[0]
+        if kind == 'range':
+            _, start, end, step, name = rule
+            last = total_pages if end is None else end
+            if start < 1 or last > total_pages or start > last:
+                skipped.append(f"{start}-{'' if end is None else end}")
+                continue
+            pages = list(range(start - 1, last, step))
+            if name is None:
+                name = f'pages{start}-{last}' + (f'_step{step}' if step > 1 else '')
+            outputs.append((pages, name))
+        elif kind == 'every':
+            _, size, start, end = rule
+            last = total_pages if end is None else end
+            if start < 1 or last > total_pages or start > last:
+                skipped.append(f"{start}-{'' if end is None else end} every {size}")
+                continue
+            for first in range(start, last + 1, size):
+                chunk_end = min(first + size - 1, last)
+                outputs.append((list(range(first - 1, chunk_end)),
+                                f'pages{first}-{chunk_end}'))
+        elif kind == 'bookmarks':
+            starts = []
+            for page_index, title in bookmarks or []:
+                # 多个书签指向同一页时只按第一个分割
+                if not starts or page_index != starts[-1][0]:
+                    starts.append((page_index, title))
+            if not starts:
+                skipped.append('bookmarks（没有书签）')
+                continue
+            if starts[0][0] > 0:
+                starts.insert(0, (0, 'front'))
+            for k, (page_index, title) in enumerate(starts):
+                stop = starts[k + 1][0] if k + 1 < len(starts) else total_pages
+                outputs.append((list(range(page_index, stop)), _safe_name(title)))
+    return outputs, skipped
+
+
+def plan_parts(pdf_path, rules, total_pages, output_dir=None, bookmarks=None):
+    """确定每个部分的输出文件，返回 (要写出的部分, 被跳过的规则说明)"""
+    if not output_dir:
+        output_dir = os.path.dirname(pdf_path)
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+
+    outputs, skipped = expand_rules(rules, total_pages, bookmarks)
+    parts = []
+    for idx, (pages, name) in enumerate(outputs, 1):
+        output_file = os.path.join(output_dir, f'{base_name}_part{idx}_{name}.pdf')
+        parts.append({'index': idx, 'pages': pages, 'name': name, 'path': output_file})
+    return parts, skipped
+
+
+def plan_split(pdf_path, rules, output_dir=None):
+    """读取PDF的页数（以及需要时的书签）并规划输出，返回 (部分, 跳过的规则, 总页数)"""
+    reader = _get_reader(pdf_path)
+    total_pages = len(reader.pages)
+    bookmarks = None
+    depths = [rule[1] for rule in rules if rule[0] == 'bookmarks']
+    if depths:
+        bookmarks = read_bookmarks(reader, max(depths))
+    parts, skipped = plan_parts(pdf_path, rules, total_pages, output_dir, bookmarks)
+    return parts, skipped, total_pages
+
+
+# 每个进程中已打开的 PdfReader，同一进程写多个部分时只解析一次
+_readers = {}
+
+
+def _get_reader(pdf_path):
+    st = os.stat(pdf_path)
+    # 文件被修改后需要重新打开
+    key = (os.path.abspath(pdf_path), st.st_size, st.st_mtime_ns)
+    reader = _readers.get(key)
+    if reader is None:
+        _readers.clear()
+        reader = _readers[key] = PdfReader(pdf_path)
+    return reader
+
+
+# 输出优化步骤：dedupe 合并相同对象，compress 压缩未压缩的流，prune 删除未使用的资源
+OPTIMIZE_STEPS = ('dedupe', 'compress', 'prune')
+DEFAULT_OPTIMIZE = ('dedupe', 'compress')
+
+# 不参与去重的对象类型（页面必须各自独立）
+_UNIQUE_TYPES = ('/Page', '/Pages', '/Catalog')
+
+_DO_RE = re.compile(rb'/([^\s/\[\]()<>{}%]+)\s+Do\b')
+_TF_RE = re.compile(rb'/([^\s/\[\]()<>{}%]+)\s+[-+.\d]+\s+Tf\b')
+
+
+def _walk_references(obj, replace=None):
+    """遍历对象中的所有间接引用；给出 replace 时按 {旧编号: 新编号} 原地替换引用"""
+    stack = [obj]
+    found = []
+    while stack:
+        current = stack.pop()
+        if isinstance(current, DictionaryObject):
+            items = list(current.items())
+        elif isinstance(current, ArrayObject):
+            items = list(enumerate(current))
+        else:
+            continue
+        for key, value in items:
+            if isinstance(value, IndirectObject):
+                if replace and value.idnum in replace:
+                    value = IndirectObject(replace[value.idnum], 0, value.pdf)
+                    current[key] = value
+                found.append(value.idnum)
+            else:
+                stack.append(value)
+    return found
+
+
+def _object_digest(obj):
+    from io import BytesIO
+
+    buffer = BytesIO()
+    obj.write_to_stream(buffer, None)
+    return hashlib.sha1(buffer.getvalue()).digest()
+
+
+def dedupe_objects(writer):
+    """合并内容完全相同的间接对象，返回合并掉的对象数
+
+    引用被替换后父对象可能也变得相同（例如引用相同字体文件的两个字体字典），
+    因此重复直到没有新的合并。被合并的对象留在原位置，由 remove_orphans 清除。
+    """
+    objects = writer._objects
+    merged = 0
+    while True:
+        seen = {}
+        replace = {}
+        for i, obj in enumerate(objects):
+            if obj is None or isinstance(obj, NullObject):
+                continue
+            if not isinstance(obj, (DictionaryObject, ArrayObject)):
+                continue
+            if isinstance(obj, DictionaryObject) and obj.get('/Type') in _UNIQUE_TYPES:
+                continue
+            first = seen.setdefault(_object_digest(obj), i)
+            if first != i:
+                replace[i + 1] = first + 1
+        if not replace:
+            return merged
+        for obj in objects:
+            if obj is not None:
+                _walk_references(obj, replace)
+        for idnum in replace:
+            objects[idnum - 1] = NullObject()
+        merged += len(replace)
+
+
+def remove_orphans(writer):
+    """把从文档目录和信息字典都引用不到的对象替换为null，返回删除的对象数
+
+    PyPDF2按位置写交叉引用表，对象不能真正删除，只能替换为很小的null对象。
+    """
+    objects = writer._objects
+    reachable = set()
+    stack = [writer._root.idnum, writer._info.idnum]
+    while stack:
+        idnum = stack.pop()
+        if idnum in reachable or not 0 < idnum <= len(objects):
+            continue
+        reachable.add(idnum)
+        obj = objects[idnum - 1]
+        if obj is not None:
+            stack.extend(_walk_references(obj))
+
+    removed = 0
+    for i, obj in enumerate(objects):
+        if i + 1 in reachable or obj is None or isinstance(obj, NullObject):
+            continue
+        objects[i] = NullObject()
+        removed += 1
+    return removed
+
+
+def compress_streams(writer):
+    """用Flate压缩所有没有过滤器的流（内容流、表单、字体等），返回压缩的流数量"""
+    objects = writer._objects
+    compressed = 0
+    for i, obj in enumerate(objects):
+        if not isinstance(obj, StreamObject) or '/Filter' in obj:
+            continue
+        encoded = obj.flate_encode()
+        if len(encoded._data) >= len(obj._data):
+            continue
+        # flate_encode 只设置 /Filter，其余条目需要复制过来
+        for key, value in obj.items():
+            if key not in ('/Filter', '/Length'):
+                encoded[key] = value
+        encoded.indirect_reference = IndirectObject(i + 1, 0, writer)
+        objects[i] = encoded
+        compressed += 1
+    return compressed
+
+
+def _page_content(page):
+    contents = page.get('/Contents')
+    if contents is None:
+        return b''
+    contents = contents.get_object()
+    if isinstance(contents, ArrayObject):
+        return b'\n'.join(item.get_object().get_data() for item in contents)
+    return contents.get_data()
+
+
+def prune_page_resources(page):
+    """删除页面资源中内容流没有用到的字体和图像/表单，返回删除的条目数
+
+    扫描的多页文档常常每页都引用一个包含全部图像的共享资源字典，
+    分割后每个部分都会带上所有图像。这里为页面建立只含实际用到条目的新资源字典。
+    用到的表单没有自己的资源（会继承页面资源）时不做删减。
+    """
+    resources = page.get('/Resources')
+    if resources is None:
+        return 0
+    resources = resources.get_object()
+    content = _page_content(page)
+    used = {'/XObject': {b'/' + name for name in _DO_RE.findall(content)},
+            '/Font': {b'/' + name for name in _TF_RE.findall(content)}}
+
+    new_resources = DictionaryObject(resources)
+    removed = 0
+    for category, names in used.items():
+        entries = resources.get(category)
+        if entries is None:
+            continue
+        entries = entries.get_object()
+        kept = DictionaryObject()
+        for key, value in entries.items():
+            if key.encode('latin-1') in names or '#' in key:
+                kept[key] = value
+                if category == '/XObject':
+                    xobject = value.get_object()
+                    if xobject.get('/Subtype') == '/Form' and '/Resources' not in xobject:
+                        return 0
+            else:
+                removed += 1
+        new_resources[NameObject(category)] = kept
+    if removed:
+        page[NameObject('/Resources')] = new_resources
+    return removed
+
+
+class _ByteCounter:
+    """只统计写入字节数的文件对象，用于测量未优化时的输出大小"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+
+def optimize_writer(writer, steps=DEFAULT_OPTIMIZE):
+    """对即将写出的 PdfWriter 执行优化步骤，返回各步骤的统计"""
+    stats = {}
+    if 'prune' in steps:
+        stats['resources_pruned'] = sum(prune_page_resources(page) for page in writer.pages)
+    if 'compress' in steps:
+        stats['streams_compressed'] = compress_streams(writer)
+    if 'dedupe' in steps:
+        stats['objects_merged'] = dedupe_objects(writer)
+    stats['orphans_removed'] = remove_orphans(writer)
+    return stats
+
+
+def write_part(task):
+    """写出一个部分，task 为 (pdf_path, part, 优化步骤, 是否统计节省字节)
+
+    先写临时文件，完成后再替换为目标文件。
+    """
+    pdf_path, part, optimize, measure = task
+    reader = _get_reader(pdf_path)
+    writer = PdfWriter()
+    for page_index in part['pages']:
+        writer.add_page(reader.pages[page_index])
+
+    result = {'index': part['index'], 'name': part['name'], 'path': part['path'],
+              'pages': len(part['pages'])}
+    if optimize:
+        if measure:
+            counter = _ByteCounter()
+            writer.write(counter)
+            result['size_before'] = counter.size
+        result.update(optimize_writer(writer, optimize))
+
+    temp_file = part['path'] + '.partial'
+    try:
+        with open(temp_file, 'wb') as f:
+            writer.write(f)
+        os.replace(temp_file, part['path'])
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    result['size'] = os.path.getsize(part['path'])
+    return result
+
+
+def run_in_pool(func, tasks, workers=None, progress_callback=None):
+    """在进程池中对每个任务调用func，按任务顺序返回结果列表
+
+    只有一个任务或 workers 为1时直接在当前进程执行，省去进程启动开销。
+    """
+    results = []
+    if not tasks:
+        return results
+
+    if workers == 1 or len(tasks) == 1:
+        for task in tasks:
+            results.append(func(task))
+            if progress_callback:
+                progress_callback(len(results), len(tasks))
+        return results
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 相邻的部分分给同一进程，减少每个进程打开的PDF次数
+        chunksize = max(1, len(tasks) // (workers * 4))
+        for result in executor.map(func, tasks, chunksize=chunksize):
+            results.append(result)
+            if progress_callback:
+                progress_callback(len(results), len(tasks))
+    return results
+
+
+def split_pdf(pdf_path, parts, workers=None, progress_callback=None, optimize=None,
+              measure=False):
+    """按 plan_parts 的结果写出各部分，返回每个部分的信息（含页数和文件大小）
+
+    optimize 为 OPTIMIZE_STEPS 中的步骤组合；measure 为True时额外统计
+    未优化时的大小（size_before），会多花一次序列化的时间。
+    """
+    if parts:
+        os.makedirs(os.path.dirname(parts[0]['path']) or '.', exist_ok=True)
+    optimize = tuple(optimize or ())
+    tasks = [(pdf_path, part, optimize, measure) for part in parts]
+    return run_in_pool(write_part, tasks, workers, progress_callback)
+
+
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+def _manifest_outputs(directory, cache):
+    """目录中各清单记录的部分文件（绝对路径）的集合"""
+    directory = os.path.abspath(directory)
+    if directory not in cache:
+        outputs = set()
+        for manifest_file in glob.glob(os.path.join(glob.escape(directory),
+                                                    '*' + MANIFEST_SUFFIX)):
+            try:
+                with open(manifest_file, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                outputs.update(os.path.normcase(part['path'])
+                               for part in manifest.get('parts', []))
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+        cache[directory] = outputs
+    return cache[directory]
+
+
+def find_pdfs(paths):
+    """展开输入：目录取其中的 .pdf 文件（不递归），含通配符的路径用glob展开（支持 **）
+
+    跳过之前分割生成的文件：清单本身、同一目录中清单列出的部分和未写完的
+    .partial 文件（部分文件和清单总是写在同一个目录中）。
+    """
+    files = []
+    seen = set()
+    manifest_outputs = {}
+    for path in paths:
+        if os.path.isdir(path):
+            matches = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                       if name.lower().endswith('.pdf')]
+        elif any(c in path for c in '*?['):
+            matches = sorted(glob.glob(path, recursive=True))
+        else:
+            matches = [path]
+        for match in matches:
+            if (match in seen or not os.path.isfile(match)
+                    or match.endswith(('.partial', MANIFEST_SUFFIX))):
+                continue
+            seen.add(match)
+            generated = _manifest_outputs(os.path.dirname(match) or '.', manifest_outputs)
+            if os.path.normcase(os.path.abspath(match)) in generated:
+                continue
+            files.append(match)
+    return files
+
+
+def manifest_path(pdf_path, output_dir=None):
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(output_dir or os.path.dirname(pdf_path), base_name + MANIFEST_SUFFIX)
+
+
+def batch_output_dirs(pdf_paths, output_dir=None):
+    """批量模式下每个PDF的输出目录
+
+    没有 output_dir 时为各自所在的目录；否则保留各文件相对于共同上级目录的
+    子目录结构，不同目录中的同名文件不会互相覆盖。
+    两个文件的输出仍然冲突（例如同一目录中的 a.pdf 和 a.PDF）时抛出ValueError。
+    """
+    if not pdf_paths:
+        return []
+    if output_dir:
+        dirs = [os.path.dirname(os.path.abspath(path)) for path in pdf_paths]
+        root = os.path.commonpath(dirs)
+        result = [os.path.normpath(os.path.join(output_dir, os.path.relpath(d, root)))
+                  for d in dirs]
+    else:
+        result = [os.path.dirname(path) for path in pdf_paths]
+
+    owners = {}
+    for pdf_path, directory in zip(pdf_paths, result):
+        key = os.path.normcase(os.path.abspath(manifest_path(pdf_path, directory)))
+        if key in owners:
+            raise ValueError(f'{owners[key]} 和 {pdf_path} 的输出文件名相同')
+        owners[key] = pdf_path
+    return result
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_up_to_date(manifest, pdf_path, rule_string, optimize, check='mtime'):
+    """判断清单记录的输出是否仍然有效
+
+    规则和优化选项必须相同，所有部分文件都存在；源文件大小和修改时间相同即视为未变，
+    check 为 'hash' 时修改时间不同再比较内容的SHA-256（只是被touch过的文件不会重新分割）。
+    """
+    if manifest.get('rules') != rule_string or manifest.get('optimize') != list(optimize):
+        return False
+    if not all(os.path.exists(part['path']) for part in manifest.get('parts', [])):
+        return False
+    source = manifest.get('source', {})
+    st = os.stat(pdf_path)
+    if source.get('size') == st.st_size and source.get('mtime_ns') == st.st_mtime_ns:
+        return True
+    if check == 'hash' and source.get('size') == st.st_size and source.get('sha256'):
+        return source['sha256'] == file_sha256(pdf_path)
+    return False
+
+
+def write_manifest(path, manifest):
+    temp_file = path + '.partial'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(temp_file, path)
+
+
+def split_one_file(task):
+    """批量分割中处理单个PDF（在工作进程中运行），返回报告行
+
+    一个文件的各部分在同一进程中顺序写出，并行度来自同时处理多个文件。
+    重新分割后删除旧清单中有、这次没有再生成的部分，否则规则改变后这些文件
+    不再被任何清单记录，下次会被当作新的输入。
+    """
+    pdf_path, rules, rule_string, output_dir, optimize, check, force = task
+    report = {'path': pdf_path, 'status': 'error', 'parts': 0, 'message': ''}
+    try:
+        manifest_file = manifest_path(pdf_path, output_dir)
+        old = None
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                old = json.load(f)
+        if old is not None and not force:
+            if is_up_to_date(old, pdf_path, rule_string, optimize, check):
+                mtime_ns = os.stat(pdf_path).st_mtime_ns
+                if old['source']['mtime_ns'] != mtime_ns:
+                    # 内容未变但被touch过，记下新的修改时间，下次不必再计算哈希
+                    old['source']['mtime_ns'] = mtime_ns
+                    write_manifest(manifest_file, old)
+                report.update(status='up-to-date', parts=len(old['parts']))
+                return report
+
+        st = os.stat(pdf_path)
+        parts, skipped, total_pages = plan_split(pdf_path, rules, output_dir)
+        results = split_pdf(pdf_path, parts, workers=1, optimize=optimize)
+        for result in results:
+            result['path'] = os.path.abspath(result['path'])
+
+        source = {'path': os.path.abspath(pdf_path), 'size': st.st_size,
+                  'mtime_ns': st.st_mtime_ns, 'pages': total_pages}
+        if check == 'hash':
+            source['sha256'] = file_sha256(pdf_path)
+        write_manifest(manifest_file, {
+            'source': source, 'rules': rule_string, 'optimize': list(optimize),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'skipped_rules': skipped, 'parts': results})
+        if old is not None:
+            current = {os.path.normcase(result['path']) for result in results}
+            for part in old.get('parts', []):
+                if (os.path.normcase(part['path']) not in current
+                        and os.path.exists(part['path'])):
+                    os.remove(part['path'])
+        report.update(status='split', parts=len(results))
+        if skipped:
+            report['message'] = '跳过的规则: ' + ', '.join(skipped)
+    except Exception as e:
+        report['message'] = f'分割失败：{str(e)}'
+    return report
+
+
+def batch_split(pdf_paths, rule_string, output_dir=None, optimize=(), check='mtime',
+                force=False, workers=None, progress_callback=None):
+    """用同一组规则分割多个PDF，返回每个文件的报告行列表
+
+    文件在多个进程中并行处理；已是最新的文件（见 is_up_to_date）除非 force 否则跳过。
+    输出目录见 batch_output_dirs。规则格式错误或输出文件冲突时抛出ValueError。
+    """
+    rules = parse_split_rules(rule_string)
+    output_dirs = batch_output_dirs(pdf_paths, output_dir)
+    for directory in set(output_dirs):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    tasks = [(pdf_path, rules, rule_string, directory, tuple(optimize), check, force)
+             for pdf_path, directory in zip(pdf_paths, output_dirs)]
+    return run_in_pool(split_one_file, tasks, workers, progress_callback)
+
+
+def command_batch(args, optimize):
+    files = find_pdfs(args.inputs)
+    if not files:
+        print('没有找到PDF文件', file=sys.stderr)
+        return 1
+
+    try:
+        parse_split_rules(args.rules)
+    except ValueError as e:
+        print(f'分页规则格式错误: {e}', file=sys.stderr)
+        return 2
+
+    def progress(done, total):
+        print(f'\r已处理 {done}/{total}', end='', file=sys.stderr)
+
+    try:
+        reports = batch_split(files, args.rules, args.output_dir, optimize, args.check,
+                              args.force, args.workers, progress)
+    except ValueError as e:
+        print(f'错误: {e}', file=sys.stderr)
+        return 2
+    print(file=sys.stderr)
+    for report in reports:
+        print(f"{report['status']}\t{report['path']}\t{report['parts']}\t{report['message']}")
+
+    counts = {}
+    for report in reports:
+        counts[report['status']] = counts.get(report['status'], 0) + 1
+    print(f"分割 {counts.get('split', 0)} 个，已是最新 {counts.get('up-to-date', 0)} 个，"
+          f"失败 {counts.get('error', 0)} 个", file=sys.stderr)
+    return 1 if counts.get('error') else 0
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='按规则分割PDF',
+                                     epilog='分页规则：\n' + RULE_HELP,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', metavar='input',
+                        help='PDF文件；多个文件、目录或通配符时为批量模式')
+    parser.add_argument('rules', help='分页规则，例如 1-5,6,7-9 或 every 10')
+    parser.add_argument('-o', '--output-dir', help='输出目录（默认为PDF所在目录）')
+    parser.add_argument('-j', '--workers', type=int, help='并行进程数（默认CPU核数）')
+    parser.add_argument('-O', '--optimize', action='store_true',
+                        help='去重相同对象、压缩未压缩的流、删除孤立对象')
+    parser.add_argument('--prune-resources', action='store_true',
+                        help='删除页面资源中未使用的字体和图像（隐含 -O）')
+    parser.add_argument('--report-savings', action='store_true',
+                        help='统计优化节省的字节数（多一次序列化，隐含 -O；仅单个文件）')
+    parser.add_argument('--check', choices=['mtime', 'hash'], default='mtime',
+                        help='批量模式判断源文件是否变化的方式（默认 mtime）')
+    parser.add_argument('--force', action='store_true', help='批量模式下忽略清单，全部重新分割')
+    args = parser.parse_args(argv)
+
+    optimize = ()
+    if args.optimize or args.prune_resources or args.report_savings:
+        optimize = DEFAULT_OPTIMIZE + (('prune',) if args.prune_resources else ())
+
+    if (len(args.inputs) > 1 or os.path.isdir(args.inputs[0])
+            or any(c in args.inputs[0] for c in '*?[')):
+        return command_batch(args, optimize)
+    args.input = args.inputs[0]
+
+    try:
+        rules = parse_split_rules(args.rules)
+    except ValueError as e:
+        print(f'分页规则格式错误: {e}', file=sys.stderr)
+        return 2
+
+    parts, skipped, total_pages = plan_split(args.input, rules, args.output_dir)
+    for rule in skipped:
+        print(f'警告: 规则 {rule} 超出页码范围或无法应用（共 {total_pages} 页），跳过',
+              file=sys.stderr)
+
+    def progress(done, total):
+        print(f'\r已写出 {done}/{total}', end='', file=sys.stderr)
+
+    results = split_pdf(args.input, parts, args.workers, progress, optimize,
+                        args.report_savings)
+    if results:
+        print(file=sys.stderr)
+    for result in results:
+        print(f"{result['path']}\t{result['pages']}\t{result['size']}")
+    if args.report_savings and results:
+        before = sum(result['size_before'] for result in results)
+        after = sum(result['size'] for result in results)
+        saved = before - after
+        print(f'优化前 {before} 字节，优化后 {after} 字节，'
+              f'节省 {saved} 字节（{saved * 100 / before:.1f}%）', file=sys.stderr)
+    return 1 if skipped else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
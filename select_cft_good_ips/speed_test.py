@@ -1,8 +1,9 @@
 import requests
 import time
 import os
-import socket
-from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit, urlunsplit
+from requests.adapters import HTTPAdapter
 
 # --- Configuration ---
 # The file containing the list of IP addresses to test.
@@ -11,35 +12,70 @@ IP_FILE = './assets/fast_ips.txt'
 DOWNLOAD_URL = 'https://your_cft_domain.cloudfront.net/50mb.test'
 # The hostname that corresponds to the CloudFront distribution.
 HOSTNAME = 'your_cft_domain.cloudfront.net'
+# How many IPs to test at the same time. All tests share the local link, so if
+# your own bandwidth is the bottleneck, higher values make every IP look slower.
+# Set to 1 to test strictly one at a time.
+CONCURRENCY = 4
 # --- End Configuration ---
 
-@contextmanager
-def force_ip_resolution(hostname, ip):
+
+class PinnedIPAdapter(HTTPAdapter):
     """
-    A context manager to temporarily force a hostname to resolve to a specific IP.
+    A transport adapter that sends every request for `hostname` to a fixed IP.
+
+    The request URL is rewritten to the IP, while the original hostname is kept
+    for the Host header, TLS SNI and certificate verification. Nothing global is
+    patched, so each thread can use its own session pinned to a different IP.
     """
-    original_create_connection = socket.create_connection
-
-    def new_create_connection(address, *args, **kwargs):
-        # If the address matches the hostname we want to override,
-        # use the forced IP. Otherwise, use the original address.
-        if address[0] == hostname:
-            forced_address = (ip, address[1])
-            return original_create_connection(forced_address, *args, **kwargs)
-        return original_create_connection(address, *args, **kwargs)
-
-    # Monkey-patch the socket's create_connection function
-    socket.create_connection = new_create_connection
-    try:
-        yield
-    finally:
-        # Always restore the original function
-        socket.create_connection = original_create_connection
+
+    def __init__(self, hostname, ip, **kwargs):
+        # Must be set before HTTPAdapter.__init__, which calls init_poolmanager
+        self.hostname = hostname
+        self.ip = ip
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs['server_hostname'] = self.hostname
+        pool_kwargs['assert_hostname'] = self.hostname
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        if parts.hostname != self.hostname:
+            return super().send(request, **kwargs)
+
+        # Only a copy is pinned: redirects are built from the original request,
+        # so a redirect to another host must not inherit the IP or the Host header
+        pinned = request.copy()
+        host = f'[{self.ip}]' if ':' in self.ip else self.ip
+        netloc = f'{host}:{parts.port}' if parts.port else host
+        pinned.headers['Host'] = parts.netloc
+        pinned.url = urlunsplit(parts._replace(netloc=netloc))
+        response = super().send(pinned, **kwargs)
+
+        # A relative Location is resolved against response.url, which must be the
+        # hostname URL so the redirected request is pinned again by this adapter
+        response.url = request.url
+        response.request = request
+        return response
+
+
+def pinned_session(hostname, ip):
+    """
+    Creates a requests session whose connections to `hostname` go to `ip`.
+    """
+    session = requests.Session()
+    adapter = PinnedIPAdapter(hostname, ip)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 def test_speed(ip, url, hostname):
     """
-    Tests the download speed from a specific IP address by forcing DNS resolution.
+    Tests the download speed from a specific IP address by pinning the connection to it.
+
+    Safe to call from several threads at once: each call uses its own session.
 
     Args:
         ip (str): The IP address to test.
@@ -60,12 +96,12 @@ def test_speed(ip, url, hostname):
     # --- 新增内容结束 ---
 
     try:
-        with force_ip_resolution(hostname, ip):
+        with pinned_session(hostname, ip) as session:
             start_time = time.time()
 
             # --- 修改内容 ---
             # 在请求中加入headers
-            response = requests.get(url, headers=headers, stream=True, timeout=30)
+            response = session.get(url, headers=headers, stream=True, timeout=30)
             # --- 修改内容结束 ---
             
             response.raise_for_status()
@@ -120,20 +156,24 @@ def main():
         print(f"No IP addresses found in '{IP_FILE}'.")
         return
 
-    print(f"Starting speed test for {len(ips)} IPs from '{IP_FILE}'...")
+    print(f"Starting speed test for {len(ips)} IPs from '{IP_FILE}' "
+          f"({CONCURRENCY} at a time)...")
     print(f"Test file: {DOWNLOAD_URL}\n")
 
     results = {}
 
-    # Test each IP
-    for ip in ips:
-        speed, error = test_speed(ip, DOWNLOAD_URL, HOSTNAME)
-        if error:
-            print(f"  Error: {error}")
-            results[ip] = 0
-        else:
-            print(f"  Speed: {speed:.2f} Mbps")
-            results[ip] = speed
+    # Test the IPs in a thread pool; each test has its own pinned session
+    with ThreadPoolExecutor(max_workers=max(1, CONCURRENCY)) as executor:
+        futures = {executor.submit(test_speed, ip, DOWNLOAD_URL, HOSTNAME): ip for ip in ips}
+        for future in as_completed(futures):
+            ip = futures[future]
+            speed, error = future.result()
+            if error:
+                print(f"  {ip}: Error: {error}")
+                results[ip] = 0
+            else:
+                print(f"  {ip}: Speed: {speed:.2f} Mbps")
+                results[ip] = speed
 
     print("\n--- Results Summary ---")
     # Sort results by speed in descending order
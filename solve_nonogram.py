@@ -1,142 +1,934 @@
-def solve_nonogram(row_clues, col_clues):
-    rows = len(row_clues)
-    cols = len(col_clues)
+"""
+Nonogram求解器
+
+用法示例：
+    python solve_nonogram.py                          # 求解内置示例
+    python solve_nonogram.py puzzle.non               # 求解单个题目并打印
+    python solve_nonogram.py puzzles/ -o results.jsonl -j 8 --timeout 10
+
+支持 .non 格式和 JSON 格式（{"rows": [[...]], "columns": [[...]]}）的题目文件。
+"""
+
+import os
+import sys
+import json
+import heapq
+import time
+from collections import OrderedDict
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:  # Python 3.9及以下
+    def popcount(x):
+        return bin(x).count('1')
+
+
+def iter_bits(x):
+    """依次返回x中为1的位的序号"""
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+def reverse_bits(x, width):
+    return int(format(x, f'0{width}b')[::-1], 2)
+
+
+class BitGrid:
+    """位掩码表示的网格
     
-    # 初始化网格: 0=未知, 1=填充, -1=空白
-    grid = [[0 for _ in range(cols)] for _ in range(rows)]
+    每行、每列各用一对整数位掩码存储：filled（已确定填充）和
+    empty（已确定空白），两者都为0的位是未知格子。
+    行 i 的第 j 位与列 j 的第 i 位是同一个格子，两份存储保持同步，
+    所以取列不需要复制，复制整个网格也只是复制四个整数列表。
+    """
+    __slots__ = ('rows', 'cols', 'row_filled', 'row_empty', 'col_filled', 'col_empty')
     
-    # 迭代直到没有变化
-    changed = True
-    while changed:
-        changed = False
-        
-        # 处理每一行
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.row_filled = [0] * rows
+        self.row_empty = [0] * rows
+        self.col_filled = [0] * cols
+        self.col_empty = [0] * cols
+    
+    @classmethod
+    def from_rows(cls, rows, cols, row_filled, row_empty):
+        """由每行的位掩码构造网格（同时生成列掩码）"""
+        grid = cls(rows, cols)
         for i in range(rows):
-            row_changed = solve_line(grid[i], row_clues[i])
-            changed = changed or row_changed
+            grid.merge('r', i, row_filled[i], row_empty[i])
+        return grid
+    
+    def copy(self):
+        other = BitGrid.__new__(BitGrid)
+        other.rows = self.rows
+        other.cols = self.cols
+        other.row_filled = self.row_filled[:]
+        other.row_empty = self.row_empty[:]
+        other.col_filled = self.col_filled[:]
+        other.col_empty = self.col_empty[:]
+        return other
+    
+    def line(self, kind, index):
+        """返回 (filled, empty, 长度)"""
+        if kind == 'r':
+            return self.row_filled[index], self.row_empty[index], self.cols
+        return self.col_filled[index], self.col_empty[index], self.rows
+    
+    def get(self, i, j):
+        bit = 1 << j
+        if self.row_filled[i] & bit:
+            return 1
+        if self.row_empty[i] & bit:
+            return -1
+        return 0
+    
+    def set(self, i, j, value):
+        if value == 1:
+            self.row_filled[i] |= 1 << j
+            self.col_filled[j] |= 1 << i
+        else:
+            self.row_empty[i] |= 1 << j
+            self.col_empty[j] |= 1 << i
+    
+    def merge(self, kind, index, add_filled, add_empty):
+        """把新确定的格子合并到某行/列，同步更新交叉的行/列
         
-        # 处理每一列
-        for j in range(cols):
-            col = [grid[i][j] for i in range(rows)]
-            col_changed = solve_line(col, col_clues[j])
-            if col_changed:
-                changed = True
-                for i in range(rows):
-                    grid[i][j] = col[i]
+        返回受影响的交叉行/列序号的位掩码。
+        """
+        if kind == 'r':
+            self.row_filled[index] |= add_filled
+            self.row_empty[index] |= add_empty
+            cross_filled, cross_empty = self.col_filled, self.col_empty
+        else:
+            self.col_filled[index] |= add_filled
+            self.col_empty[index] |= add_empty
+            cross_filled, cross_empty = self.row_filled, self.row_empty
+        bit = 1 << index
+        for k in iter_bits(add_filled):
+            cross_filled[k] |= bit
+        for k in iter_bits(add_empty):
+            cross_empty[k] |= bit
+        return add_filled | add_empty
+    
+    def unknown(self, kind, index):
+        """某行/列中未知格子的数量"""
+        filled, empty, length = self.line(kind, index)
+        return length - popcount(filled | empty)
     
-    return grid
+    def is_complete(self):
+        full = (1 << self.cols) - 1
+        return all((f | e) == full for f, e in zip(self.row_filled, self.row_empty))
+    
+    def to_lists(self):
+        """转换为列表网格: 0=未知, 1=填充, -1=空白"""
+        return [[self.get(i, j) for j in range(self.cols)] for i in range(self.rows)]
+
 
 def solve_line(line, clues):
-    """解决一行或一列，返回是否有变化"""
-    length = len(line)
-    old_line = line.copy()
-    
-    # 特殊情况：没有提示，整行/列都是空白
-    if not clues:
-        for i in range(length):
-            line[i] = -1
-        return line != old_line
-    
-    # 生成所有可能的填充方案
-    all_arrangements = []
-    
-    def generate_arrangements(arrangement, pos, clue_idx):
-        # 所有提示都已使用
-        if clue_idx == len(clues):
-            # 剩余位置填充为空白
-            full_arrangement = arrangement + [-1] * (length - pos)
-            
-            # 检查方案是否与当前状态兼容
-            if all(line[i] == 0 or line[i] == full_arrangement[i] for i in range(length)):
-                all_arrangements.append(full_arrangement)
+    """解决一行或一列（0/1/-1列表），原地修改，返回是否有变化"""
+    filled = empty = 0
+    for i, cell in enumerate(line):
+        if cell == 1:
+            filled |= 1 << i
+        elif cell == -1:
+            empty |= 1 << i
+    
+    result = solve_line_bits(filled, empty, len(line), clues)
+    # 无解情况
+    if result is None:
+        return False
+    
+    new_filled, new_empty = result
+    for i in iter_bits(new_filled & ~filled):
+        line[i] = 1
+    for i in iter_bits(new_empty & ~empty):
+        line[i] = -1
+    return new_filled != filled or new_empty != empty
+
+def _closure(seeds, blankable):
+    """从seeds中的位置出发，经过可留白的格子向后能到达的所有位置
+    
+    位置p表示已处理前p个格子；格子p可留白时可以从位置p走到p+1。
+    对一段连续的可留白格子，加法进位恰好从最低的起点一直传到段尾之后。
+    """
+    return seeds | (((seeds & blankable) + blankable) ^ blankable)
+
+def _forward(filled, empty, length, clues):
+    """按位并行的前向DP
+    
+    返回 (reach, starts)：reach[j] 是前j个块放完后可能到达的位置集合
+    （位置p的位表示前p个格子恰好放下前j个块），
+    starts[j] 是第j个块可能的起始格子集合（尚未检查块本身能否放下）。
+    """
+    full = (1 << length) - 1
+    blankable = full & ~filled
+    reach = [_closure(1, blankable)]
+    starts = []
+    for j, block in enumerate(clues):
+        # 第一个块可以从开头开始，之后的块前面必须有一个空白格
+        start = reach[j] if j == 0 else (reach[j] & blankable) << 1
+        starts.append(start)
+        reach.append(_closure((start & _runs(full & ~empty, block)) << block, blankable))
+    return reach, starts
+
+def _runs(mask, size):
+    """返回位集合：从该位开始连续size个位在mask中都为1"""
+    result = mask
+    have = 1
+    while have < size:
+        step = min(have, size - have)
+        result &= result >> step
+        have += step
+    return result
+
+def _spread(mask, size):
+    """把mask中的每一位向高位扩展成连续size位"""
+    result = mask
+    have = 1
+    while have < size:
+        step = min(have, size - have)
+        result |= result << step
+        have += step
+    return result
+
+def solve_line_bits(filled, empty, length, clues):
+    """在位掩码上求解一行或一列
+    
+    与逐格DP相同的前向/后向DP（位置 × 提示序号），但每个提示序号的
+    所有位置用一个整数的位并行计算。返回推理后的 (filled, empty)，
+    无解时返回None。
+    """
+    clues = [c for c in clues if c > 0]
+    k = len(clues)
+    full = (1 << length) - 1
+    blankable = full & ~filled
+    
+    reach, starts = _forward(filled, empty, length, clues)
+    if not (reach[k] >> length) & 1:
+        return None
+    
+    # 后向DP = 在翻转后的行上做前向DP；翻转回来后，
+    # back[j] 的第x位表示从第x个格子到末尾恰好放下最后j个块
+    rev_reach, _ = _forward(reverse_bits(filled, length), reverse_bits(empty, length),
+                            length, clues[::-1])
+    back = [reverse_bits(r, length + 1) for r in rev_reach]
+    
+    # 格子x可以留白：存在j使前x格放下前j个块，且x+1之后放下其余的块
+    can_blank = 0
+    for j in range(k + 1):
+        can_blank |= reach[j] & (back[k - j] >> 1)
+    can_blank &= blankable
+    
+    # 格子可以填充：被某个块的某个合法位置覆盖
+    fillable = full & ~empty
+    can_fill = 0
+    for j, block in enumerate(clues):
+        if j == k - 1:
+            end_ok = back[0]
+        else:
+            # 块后面需要一个空白格
+            end_ok = blankable & (back[k - j - 1] >> 1)
+        valid = starts[j] & _runs(fillable, block) & (end_ok >> block)
+        can_fill |= _spread(valid, block)
+    
+    return full & ~can_blank, full & ~can_fill
+
+class LineCache:
+    """行求解结果的LRU缓存
+    
+    键为 (提示元组, 长度, filled, empty)，值为 solve_line_bits 的结果
+    （无解时为None）。对称或重复的提示、以及探测中反复出现的同一行状态
+    命中时可以完全跳过DP。maxsize为0时不缓存。
+    """
+    
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def solve(self, filled, empty, length, clues):
+        """clues需为元组"""
+        key = (clues, length, filled, empty)
+        entries = self.entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+        
+        self.misses += 1
+        result = solve_line_bits(filled, empty, length, clues)
+        if self.maxsize:
+            entries[key] = result
+            if len(entries) > self.maxsize:
+                entries.popitem(last=False)
+        return result
+    
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries),
+                'maxsize': self.maxsize, 'hit_rate': self.hit_rate}
+
+def init_stats(stats):
+    """补全统计字典中的计数项"""
+    if stats is None:
+        stats = {}
+    for key in ('line_solves', 'cells_fixed', 'probes', 'nodes', 'backtracks',
+                'cache_hits', 'cache_misses'):
+        stats.setdefault(key, 0)
+    return stats
+
+def slack(clues, length):
+    """余量越小，能直接推出的格子越多"""
+    return length - sum(clues) - max(len(clues) - 1, 0)
+
+def record_cache_stats(stats, cache, hits, misses):
+    """把本次求解期间缓存的命中/未命中次数累加到stats"""
+    stats['cache_hits'] += cache.hits - hits
+    stats['cache_misses'] += cache.misses - misses
+
+# 求解事件类型，iter_solve 产出的事件是以类型开头的元组：
+#   ('line_solved', 类型'r'/'c', 序号)              一次行/列求解
+#   ('cells_fixed', 类型, 序号, 新填充位, 新空白位)  某行/列新确定了格子
+#   ('probe', i, j)                                 开始探测格子
+#   ('branch', i, j, 取值, 深度)                    搜索中假设格子取值
+#   ('contradiction', i, j, 取值)                   该假设导致矛盾
+#   ('backtrack', 深度)                             放弃一个搜索节点
+#   ('solution', 网格)                              找到一个解（列表网格）
+#   ('stalled', 网格)                               关闭搜索时逻辑推理停止的结果
+#   ('done', 状态)                                  求解结束
+EVENT_TYPES = ('line_solved', 'cells_fixed', 'probe', 'branch', 'contradiction',
+               'backtrack', 'solution', 'stalled', 'done')
+
+NO_EVENTS = frozenset()
+
+def run_quietly(generator):
+    """执行一个不需要观察事件的生成器，返回它的返回值"""
+    try:
+        while True:
+            next(generator)
+    except StopIteration as stop:
+        return stop.value
+
+def propagate_iter(grid, row_clues, col_clues, dirty, stats, cache, events):
+    """从dirty中的行/列开始做行列逻辑推理，原地修改网格
+    
+    使用脏行队列：只有经过新确定格子的行/列才会重新求解，
+    未知格子最少的行/列优先。产出 events 中订阅的行级事件；
+    返回值为False表示出现矛盾（某行/列无解）。
+    """
+    want_line = 'line_solved' in events
+    want_fixed = 'cells_fixed' in events
+    clues = {'r': row_clues, 'c': col_clues}
+    
+    # 优先队列元素: (未知格子数, 余量, 类型, 序号)
+    queue = []
+    queued = set()
+    
+    def push(kind, index):
+        if (kind, index) in queued:
             return
+        filled, empty, length = grid.line(kind, index)
+        unknown = length - popcount(filled | empty)
+        if unknown:
+            queued.add((kind, index))
+            heapq.heappush(queue, (unknown, slack(clues[kind][index], length), kind, index))
+    
+    for kind, index in dirty:
+        push(kind, index)
+    
+    while queue:
+        _, _, kind, index = heapq.heappop(queue)
+        queued.discard((kind, index))
+        filled, empty, length = grid.line(kind, index)
+        stats['line_solves'] += 1
         
-        block_size = clues[clue_idx]
+        result = cache.solve(filled, empty, length, clues[kind][index])
+        if result is None:
+            return False
+        if want_line:
+            yield ('line_solved', kind, index)
         
-        # 尝试在不同位置放置当前块
-        max_pos = length - sum(clues[clue_idx:]) - (len(clues) - clue_idx - 1)
-        for i in range(pos, max_pos + 1):
-            # 检查是否可以在位置i放置块
-            can_place = True
-            
-            # 检查块之前的位置
-            for j in range(pos, i):
-                if line[j] == 1:
-                    can_place = False
-                    break
-            
-            if not can_place:
+        add_filled = result[0] & ~filled
+        add_empty = result[1] & ~empty
+        if add_filled or add_empty:
+            changed = grid.merge(kind, index, add_filled, add_empty)
+            stats['cells_fixed'] += popcount(changed)
+            if want_fixed:
+                yield ('cells_fixed', kind, index, add_filled, add_empty)
+            # 把交叉的行/列加入队列
+            other = 'c' if kind == 'r' else 'r'
+            for k in iter_bits(changed):
+                push(other, k)
+    
+    return True
+
+def propagate(grid, row_clues, col_clues, dirty, stats, cache):
+    """不产出事件的 propagate_iter，出现矛盾时返回False"""
+    return run_quietly(propagate_iter(grid, row_clues, col_clues, dirty, stats, cache,
+                                      NO_EVENTS))
+
+def all_lines(rows, cols):
+    return [('r', i) for i in range(rows)] + [('c', j) for j in range(cols)]
+
+def solve_nonogram(row_clues, col_clues, stats=None, cache=None):
+    """用行列逻辑推理求解，无法继续推理的格子保持未知(0)
+    
+    stats 字典（可选）会累加计数：line_solves（行/列求解次数）、
+    cells_fixed（确定的格子数）、cache_hits/cache_misses（行求解缓存）。
+    cache 为 LineCache，默认每次求解新建一个。
+    """
+    for event in iter_solve(row_clues, col_clues, search=False, stats=stats, cache=cache,
+                            events=('solution', 'stalled')):
+        return event[1]
+
+class SearchBudgetExceeded(Exception):
+    """搜索超出时间或节点预算"""
+
+def apply_deductions(grid, filled_rows, empty_rows):
+    """把每行新确定的填充/空白位合并进网格，返回需要重新推理的行/列"""
+    dirty = []
+    for i in range(grid.rows):
+        add_filled = filled_rows[i] & ~grid.row_filled[i]
+        add_empty = empty_rows[i] & ~grid.row_empty[i]
+        if add_filled or add_empty:
+            changed = grid.merge('r', i, add_filled, add_empty)
+            dirty.append(('r', i))
+            dirty.extend(('c', j) for j in iter_bits(changed))
+    return dirty
+
+def probe_cell_iter(grid, i, j, row_clues, col_clues, stats, cache, events):
+    """探测一个格子：分别假设填充/空白并完整推理
+    
+    一边矛盾则该格子取另一个值；两边都能推理下去时，
+    两个分支一致确定的格子也可以直接确定。原地修改网格；
+    返回值为None表示当前网格本身矛盾，否则表示是否有新进展。
+    """
+    want_contradiction = 'contradiction' in events
+    branches = []
+    for value in (1, -1):
+        stats['probes'] += 1
+        branch = grid.copy()
+        branch.set(i, j, value)
+        if (yield from propagate_iter(branch, row_clues, col_clues,
+                                      [('r', i), ('c', j)], stats, cache, events)):
+            branches.append(branch)
+        elif want_contradiction:
+            yield ('contradiction', i, j, value)
+    
+    if not branches:
+        return None
+    
+    if len(branches) == 1:
+        # 另一个假设矛盾，直接采用这个分支的推理结果
+        only = branches[0]
+        dirty = apply_deductions(grid, only.row_filled, only.row_empty)
+    else:
+        # 两个分支都确定且取值相同的格子
+        a, b = branches
+        dirty = apply_deductions(
+            grid,
+            [x & y for x, y in zip(a.row_filled, b.row_filled)],
+            [x & y for x, y in zip(a.row_empty, b.row_empty)])
+        if not dirty:
+            return False
+    
+    if not (yield from propagate_iter(grid, row_clues, col_clues, dirty,
+                                      stats, cache, events)):
+        return None
+    return True
+
+def unknown_cells(grid):
+    full = (1 << grid.cols) - 1
+    return [(i, j) for i in range(grid.rows)
+            for j in iter_bits(full & ~(grid.row_filled[i] | grid.row_empty[i]))]
+
+def probe_iter(grid, row_clues, col_clues, stats, cache, check_budget, events,
+               pool=None, deadline=None):
+    """探测所有未知格子，重复直到没有新进展
+    
+    原地修改网格，返回值为False表示当前网格本身矛盾。
+    给出 ProbePool 且未知格子足够多时使用并行探测（见 parallel_probe_round），
+    此时不产出单个格子的 probe/contradiction 事件。
+    """
+    want_probe = 'probe' in events
+    progress = True
+    while progress:
+        progress = False
+        
+        if pool is not None and len(unknown_cells(grid)) >= PARALLEL_PROBE_MIN_CELLS:
+            check_budget()
+            result = yield from parallel_probe_round(grid, row_clues, col_clues, stats,
+                                                     cache, events, pool, deadline)
+            if result is None:
+                return False
+            progress = result
+            continue
+        
+        for i, j in unknown_cells(grid):
+            if grid.get(i, j) != 0:
                 continue
+            check_budget()
+            if want_probe:
+                yield ('probe', i, j)
+            result = yield from probe_cell_iter(grid, i, j, row_clues, col_clues,
+                                                stats, cache, events)
+            if result is None:
+                return False
+            progress = progress or result
+    return True
+
+# 未知格子少于这个数量时不值得分发到进程池
+PARALLEL_PROBE_MIN_CELLS = 200
+
+# 每个工作进程分到的批次数。批次之间看不到彼此的结论，分得越细重复探测越多，
+# 实测每进程一批（交错分配格子）总探测次数最少
+PARALLEL_PROBE_BATCHES_PER_WORKER = 1
+
+# 工作进程中的提示和行求解缓存（由 _init_probe_worker 设置）
+_worker_state = {}
+
+def _init_probe_worker(row_clues, col_clues):
+    _worker_state['row_clues'] = row_clues
+    _worker_state['col_clues'] = col_clues
+    _worker_state['cache'] = LineCache()
+
+class ProbePool:
+    """并行探测用的进程池，每个工作进程只在启动时接收一次提示"""
+    
+    def __init__(self, workers, row_clues, col_clues):
+        from concurrent.futures import ProcessPoolExecutor
+        
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            initializer=_init_probe_worker,
+                                            initargs=(row_clues, col_clues))
+    
+    def submit(self, *args):
+        return self.executor.submit(_probe_batch, *args)
+    
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+def _probe_batch(rows, cols, row_filled, row_empty, cells, deadline):
+    """在工作进程中依次探测一批格子
+    
+    从主进程发来的网格快照出发，探测得到的结论在本地立即生效，
+    后续探测可以利用。返回 ((row_filled, row_empty) 或None, 统计)，
+    None 表示快照本身矛盾。超过 deadline 时提前返回已得到的结论。
+    """
+    grid = BitGrid.from_rows(rows, cols, row_filled, row_empty)
+    cache = _worker_state['cache']
+    stats = init_stats(None)
+    hits, misses = cache.hits, cache.misses
+    result = (grid.row_filled, grid.row_empty)
+    for i, j in cells:
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        if grid.get(i, j) != 0:
+            continue
+        outcome = run_quietly(probe_cell_iter(grid, i, j, _worker_state['row_clues'],
+                                              _worker_state['col_clues'], stats, cache,
+                                              NO_EVENTS))
+        if outcome is None:
+            result = None
+            break
+    record_cache_stats(stats, cache, hits, misses)
+    return result, stats
+
+def parallel_probe_round(grid, row_clues, col_clues, stats, cache, events, pool,
+                         deadline=None):
+    """并行探测一轮：把网格快照和分批的未知格子发给进程池，合并各批的结论
+    
+    每批的结论都是从快照推出的必然结果，因此可以直接取并集；
+    并集中同一格子既填充又空白说明快照矛盾。
+    返回值为None表示矛盾，否则表示是否有新进展。
+    """
+    cells = unknown_cells(grid)
+    batch_count = pool.workers * PARALLEL_PROBE_BATCHES_PER_WORKER
+    # 交错分批，避免难探测的区域集中在同一批
+    batches = [cells[k::batch_count] for k in range(batch_count) if cells[k::batch_count]]
+    futures = [pool.submit(grid.rows, grid.cols, grid.row_filled, grid.row_empty,
+                           batch, deadline) for batch in batches]
+    
+    merged_filled = [0] * grid.rows
+    merged_empty = [0] * grid.rows
+    contradiction = False
+    for future in futures:
+        result, batch_stats = future.result()
+        for key, value in batch_stats.items():
+            stats[key] += value
+        if result is None:
+            contradiction = True
+            continue
+        for i in range(grid.rows):
+            merged_filled[i] |= result[0][i]
+            merged_empty[i] |= result[1][i]
+    
+    if contradiction or any(f & e for f, e in zip(merged_filled, merged_empty)):
+        return None
+    
+    dirty = apply_deductions(grid, merged_filled, merged_empty)
+    if not dirty:
+        return False
+    if not (yield from propagate_iter(grid, row_clues, col_clues, dirty,
+                                      stats, cache, events)):
+        return None
+    return True
+
+def choose_cell(grid):
+    """选择分支的格子：未知格子最少（但不为0）的行中的第一个未知格子"""
+    best = None
+    for i in range(grid.rows):
+        unknown = grid.unknown('r', i)
+        if unknown and (best is None or unknown < best[0]):
+            best = (unknown, i)
+    if best is None:
+        return None
+    i = best[1]
+    unknown_bits = ((1 << grid.cols) - 1) & ~(grid.row_filled[i] | grid.row_empty[i])
+    return i, (unknown_bits & -unknown_bits).bit_length() - 1
+
+def solve_complete(row_clues, col_clues, max_solutions=2, time_limit=None,
+                   node_limit=None, probing=True, stats=None, cache=None, probe_workers=None):
+    """完整求解：行列推理 + 探测 + 深度优先回溯
+    
+    返回 (solutions, status)。solutions 是找到的解（网格列表）；
+    status: 'complete' 表示搜索空间已穷尽，solutions 就是全部解；
+    'limit' 表示已找到 max_solutions 个解后停止（设为2可用于检验唯一解）；
+    'timeout' 表示超出 time_limit 秒或 node_limit 个搜索节点。
+    max_solutions 为None时查找所有解。cache 为 LineCache，默认每次求解新建一个。
+    probe_workers 大于1时用多个进程并行探测（适合100x100以上的大题目）。
+    """
+    solutions = []
+    status = None
+    for event in iter_solve(row_clues, col_clues, max_solutions, time_limit, node_limit,
+                            probing, stats=stats, cache=cache, events=('solution', 'done'),
+                            probe_workers=probe_workers):
+        if event[0] == 'solution':
+            solutions.append(event[1])
+        else:
+            status = event[1]
+    return solutions, status
+
+def iter_solve(row_clues, col_clues, max_solutions=2, time_limit=None, node_limit=None,
+               probing=True, search=True, stats=None, cache=None, events=None,
+               probe_workers=None):
+    """逐步求解的生成器，产出求解事件（见 EVENT_TYPES）
+    
+    参数含义同 solve_complete；search 为False时只做行列逻辑推理，
+    最后产出 ('solution', 网格) 或 ('stalled', 网格)，结束状态为 'complete'，
+    推理出现矛盾时为 'contradiction'。events 为要订阅的
+    事件类型集合，默认全部；未订阅的事件不会构造，没有额外开销。
+    最后一个事件总是 ('done', 状态)。消费者可以随时停止迭代来中止求解。
+    """
+    events = frozenset(EVENT_TYPES if events is None else events)
+    stats = init_stats(stats)
+    if cache is None:
+        cache = LineCache()
+    hits, misses = cache.hits, cache.misses
+    row_clues = [tuple(c) for c in row_clues]
+    col_clues = [tuple(c) for c in col_clues]
+    pool = None
+    if probing and search and probe_workers and probe_workers > 1:
+        pool = ProbePool(probe_workers, row_clues, col_clues)
+    try:
+        status = yield from _search_iter(row_clues, col_clues, max_solutions, time_limit,
+                                         node_limit, probing, search, stats, cache, events,
+                                         pool)
+    finally:
+        record_cache_stats(stats, cache, hits, misses)
+        if pool is not None:
+            pool.close()
+    yield ('done', status)
+
+def _search_iter(row_clues, col_clues, max_solutions, time_limit, node_limit, probing,
+                 search, stats, cache, events, pool):
+    rows, cols = len(row_clues), len(col_clues)
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    want_branch = 'branch' in events
+    want_contradiction = 'contradiction' in events
+    want_backtrack = 'backtrack' in events
+    
+    def check_budget():
+        if deadline is not None and time.monotonic() > deadline:
+            raise SearchBudgetExceeded()
+        if node_limit is not None and stats['nodes'] > node_limit:
+            raise SearchBudgetExceeded()
+    
+    grid = BitGrid(rows, cols)
+    consistent = yield from propagate_iter(grid, row_clues, col_clues, all_lines(rows, cols),
+                                           stats, cache, events)
+    if not search:
+        if consistent and grid.is_complete():
+            yield ('solution', grid.to_lists())
+        else:
+            yield ('stalled', grid.to_lists())
+        return 'complete' if consistent else 'contradiction'
+    if not consistent:
+        return 'complete'
+    
+    found = 0
+    # 用显式栈代替递归，大网格的搜索深度可能超过递归限制
+    stack = [(grid, 0)]
+    try:
+        while stack:
+            grid, depth = stack.pop()
+            stats['nodes'] += 1
+            check_budget()
             
-            # 检查块内的位置
-            for j in range(i, i + block_size):
-                if j >= length or line[j] == -1:
-                    can_place = False
-                    break
-            
-            if not can_place:
+            if probing and not (yield from probe_iter(grid, row_clues, col_clues, stats,
+                                                      cache, check_budget, events,
+                                                      pool, deadline)):
+                stats['backtracks'] += 1
+                if want_backtrack:
+                    yield ('backtrack', depth)
                 continue
             
-            # 检查块之后的位置
-            if i + block_size < length and line[i + block_size] == 1:
+            cell = choose_cell(grid)
+            if cell is None:
+                found += 1
+                yield ('solution', grid.to_lists())
+                if max_solutions is not None and found >= max_solutions:
+                    return 'limit'
                 continue
             
-            # 创建新的填充方案
-            new_arrangement = arrangement.copy()
-            
-            # 填充块之前的空白
-            for j in range(pos, i):
-                new_arrangement.append(-1)
-            
-            # 填充块
-            for j in range(i, i + block_size):
-                new_arrangement.append(1)
-            
-            # 填充块之后的空白分隔符
-            if i + block_size < length:
-                new_arrangement.append(-1)
-                generate_arrangements(new_arrangement, i + block_size + 1, clue_idx + 1)
-            else:
-                generate_arrangements(new_arrangement, i + block_size, clue_idx + 1)
+            i, j = cell
+            # 先压入空白分支，填充分支先被搜索
+            for value in (-1, 1):
+                if want_branch:
+                    yield ('branch', i, j, value, depth + 1)
+                branch = grid.copy()
+                branch.set(i, j, value)
+                if (yield from propagate_iter(branch, row_clues, col_clues,
+                                              [('r', i), ('c', j)], stats, cache, events)):
+                    stack.append((branch, depth + 1))
+                else:
+                    stats['backtracks'] += 1
+                    if want_contradiction:
+                        yield ('contradiction', i, j, value)
+    except SearchBudgetExceeded:
+        return 'timeout'
     
-    # 生成所有可能的填充方案
-    generate_arrangements([], 0, 0)
+    return 'complete'
+
+
+# 题目文件中可以识别的扩展名
+PUZZLE_EXTENSIONS = ('.non', '.json')
+
+# .non 格式中的关键字（rows/columns 之后是提示行）
+NON_KEYWORDS = {'catalogue', 'title', 'by', 'copyright', 'license', 'width', 'height',
+                'rows', 'columns', 'goal', 'solution', 'color', 'note'}
+
+def parse_clue_line(text):
+    """解析一行提示，例如 '1,2 3'；空行或 '0' 表示没有块"""
+    numbers = [int(x) for x in text.replace(',', ' ').split()]
+    return [n for n in numbers if n > 0]
+
+def parse_goal(goal, rows, cols):
+    """把 .non 的 goal 字符串（按行拼接的0/1）转成列表网格"""
+    goal = goal.strip().strip('"')
+    if len(goal) != rows * cols:
+        return None
+    return [[1 if goal[i * cols + j] == '1' else -1 for j in range(cols)]
+            for i in range(rows)]
+
+def parse_non(text):
+    """解析 .non 格式的题目，返回题目字典"""
+    puzzle = {}
+    sections = {'rows': [], 'columns': []}
+    current = None
     
-    # 无解情况
-    if not all_arrangements:
-        return False
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        word = line.split(None, 1)[0].lower() if line else ''
+        if word in NON_KEYWORDS:
+            current = None
+            value = line[len(word):].strip()
+            if word in sections:
+                current = sections[word]
+            elif word in ('width', 'height'):
+                puzzle[word] = int(value)
+            elif word in ('title', 'by', 'goal'):
+                puzzle[word] = value.strip('"')
+        elif current is not None:
+            current.append(line)
     
-    # 根据所有可能方案确定格子状态
-    for i in range(length):
-        if line[i] == 0:  # 只处理未确定的格子
-            all_black = True
-            all_white = True
-            
-            for arrangement in all_arrangements:
-                if arrangement[i] == -1:
-                    all_black = False
-                elif arrangement[i] == 1:
-                    all_white = False
-            
-            if all_black:
-                line[i] = 1
-            elif all_white:
-                line[i] = -1
+    clues = {}
+    for name, lines in sections.items():
+        # 去掉段前后的空行，段内的空行表示没有块
+        while lines and not lines[0]:
+            lines.pop(0)
+        while lines and not lines[-1]:
+            lines.pop()
+        clues[name] = [parse_clue_line(line) for line in lines]
+    
+    rows, cols = clues['rows'], clues['columns']
+    if puzzle.get('height', len(rows)) != len(rows):
+        raise ValueError(f"height 为 {puzzle['height']}，但有 {len(rows)} 行提示")
+    if puzzle.get('width', len(cols)) != len(cols):
+        raise ValueError(f"width 为 {puzzle['width']}，但有 {len(cols)} 列提示")
+    
+    result = {'rows': rows, 'columns': cols, 'title': puzzle.get('title', '')}
+    if 'goal' in puzzle:
+        result['goal'] = parse_goal(puzzle['goal'], len(rows), len(cols))
+    return result
+
+def parse_json(text):
+    """解析 JSON 格式的题目：{"rows": [...], "columns": [...], "title": ..., "goal": [...]}
     
-    return line != old_line
+    goal 可选，为字符串列表，'#' 或 '1' 表示填充。
+    """
+    data = json.loads(text)
+    result = {'rows': [list(c) for c in data['rows']],
+              'columns': [list(c) for c in data['columns']],
+              'title': data.get('title', '')}
+    if data.get('goal'):
+        result['goal'] = [[1 if ch in '#1' else -1 for ch in row] for row in data['goal']]
+    return result
 
-# 使用给定的提示解决nonogram
-row_clues = [[6], [1, 1], [1, 1, 1], [6, 1, 1], [1, 1], [1, 7], [4, 2], [1, 3, 3], 
-             [1, 1, 1, 1, 1], [4, 1, 2, 3], [1, 1], [1, 3, 2], [3, 2, 1, 1], [1, 1, 1, 1], [5, 4]]
-col_clues = [[4,1],[1,1,1],[1,1,1],[1,4,3],[1,1,1],[4,6,1],[1,1,1],[1,3,3],
-             [1,4,4],[1,1,1],[4,5,4],[3,1,1],[1,3,1],[1,4],[1,1]]
+def load_puzzle(path):
+    """按扩展名读取题目文件，返回题目字典（含 name）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if path.lower().endswith('.json'):
+        puzzle = parse_json(text)
+    else:
+        puzzle = parse_non(text)
+    puzzle['name'] = os.path.basename(path)
+    return puzzle
 
-# 求解nonogram
-solution = solve_nonogram(row_clues, col_clues)
+def find_puzzles(paths):
+    """展开路径：目录中递归查找题目文件，文件原样保留"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names
+                             if name.lower().endswith(PUZZLE_EXTENSIONS))
+        else:
+            files.append(path)
+    return sorted(files)
+
+def grid_to_strings(grid):
+    return [''.join('#' if cell == 1 else '.' if cell == -1 else '?' for cell in row)
+            for row in grid]
+
+def solve_puzzle(puzzle, timeout=None, max_solutions=2):
+    """求解一个题目字典，返回结果记录（可直接写成JSON）
+    
+    记录包含 status、解的数量、是否唯一、第一个解、耗时（秒）和统计计数；
+    题目带有 goal 时还会记录第一个解是否与之相同。
+    """
+    stats = {}
+    start = time.perf_counter()
+    solutions, status = solve_complete(puzzle['rows'], puzzle['columns'],
+                                       max_solutions=max_solutions,
+                                       time_limit=timeout, stats=stats)
+    elapsed = time.perf_counter() - start
+    
+    record = {'name': puzzle.get('name', ''), 'title': puzzle.get('title', ''),
+              'width': len(puzzle['columns']), 'height': len(puzzle['rows']),
+              'status': status, 'solutions': len(solutions),
+              'unique': status == 'complete' and len(solutions) == 1,
+              'time': round(elapsed, 6), 'stats': stats,
+              'solution': grid_to_strings(solutions[0]) if solutions else None}
+    if puzzle.get('goal') is not None:
+        record['matches_goal'] = bool(solutions) and solutions[0] == puzzle['goal']
+    return record
+
+def solve_puzzle_file(task):
+    """进程池中求解单个题目文件，task 为 (路径, 超时秒数, 最多解数)"""
+    path, timeout, max_solutions = task
+    try:
+        puzzle = load_puzzle(path)
+    except (OSError, ValueError, KeyError) as e:
+        return {'name': os.path.basename(path), 'path': path, 'status': 'error',
+                'error': str(e)}
+    record = solve_puzzle(puzzle, timeout, max_solutions)
+    record['path'] = path
+    return record
+
+def solve_batch(paths, workers=None, timeout=None, max_solutions=2):
+    """在进程池中求解多个题目文件，按完成顺序逐个产出结果记录
+    
+    超时由求解器在搜索中自行检查（time_limit），超时的题目 status 为 'timeout'。
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    tasks = [(path, timeout, max_solutions) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(solve_puzzle_file, task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
 
 # 打印结果
 def print_solution(grid):
     for row in grid:
         print(''.join(['█' if cell == 1 else '·' if cell == -1 else '?' for cell in row]))
 
-print_solution(solution)
\ No newline at end of file
+# 内置示例题目
+EXAMPLE_ROW_CLUES = [[6], [1, 1], [1, 1, 1], [6, 1, 1], [1, 1], [1, 7], [4, 2], [1, 3, 3], 
+                     [1, 1, 1, 1, 1], [4, 1, 2, 3], [1, 1], [1, 3, 2], [3, 2, 1, 1], [1, 1, 1, 1], [5, 4]]
+EXAMPLE_COL_CLUES = [[4,1],[1,1,1],[1,1,1],[1,4,3],[1,1,1],[4,6,1],[1,1,1],[1,3,3],
+                     [1,4,4],[1,1,1],[4,5,4],[3,1,1],[1,3,1],[1,4],[1,1]]
+
+def print_puzzle_result(puzzle, timeout=None):
+    """求解一个题目并打印解（只找两个解，用来检验是否唯一）"""
+    row_clues, col_clues = puzzle['rows'], puzzle['columns']
+    solutions, status = solve_complete(row_clues, col_clues, max_solutions=2,
+                                       time_limit=timeout)
+    if solutions:
+        print_solution(solutions[0])
+        if len(solutions) > 1:
+            print('解不唯一')
+    else:
+        # 无解或超出预算时打印逻辑推理能确定的部分
+        print_solution(solve_nonogram(row_clues, col_clues))
+        print('无解' if status == 'complete' else '超出搜索预算')
+
+def main(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Nonogram求解器')
+    parser.add_argument('paths', nargs='*', help='题目文件或目录（.non / .json），省略时求解内置示例')
+    parser.add_argument('-o', '--output', help='批量模式：结果写入的JSON Lines文件（默认stdout）')
+    parser.add_argument('-j', '--workers', type=int, help='批量模式的并行进程数')
+    parser.add_argument('--timeout', type=float, help='每个题目的求解时间上限（秒）')
+    parser.add_argument('--max-solutions', type=int, default=2,
+                        help='最多查找的解数量（默认2，用于检验唯一解）')
+    args = parser.parse_args(argv)
+    
+    if not args.paths:
+        print_puzzle_result({'rows': EXAMPLE_ROW_CLUES, 'columns': EXAMPLE_COL_CLUES},
+                            args.timeout)
+        return 0
+    
+    files = find_puzzles(args.paths)
+    if len(files) == 1 and not args.output and not os.path.isdir(args.paths[0]):
+        print_puzzle_result(load_puzzle(files[0]), args.timeout)
+        return 0
+    
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    counts = {}
+    try:
+        for record in solve_batch(files, args.workers, args.timeout, args.max_solutions):
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+            counts[record['status']] = counts.get(record['status'], 0) + 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    summary = '，'.join(f'{status} {count}' for status, count in sorted(counts.items()))
+    print(f"共 {len(files)} 个题目：{summary}", file=sys.stderr)
+    return 1 if counts.get('error') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())